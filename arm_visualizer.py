@@ -0,0 +1,321 @@
+"""
+アームの描画プラグイン
+
+RobotArm(visualizer=...) で選ぶ。
+- 'matplotlib': 同じプロセスのウィンドウに描画（既定）
+- 'blit': 同じプロセスで背景をキャッシュし、動く部分だけを上限 fps で描画
+- 'process': 別プロセスのウィンドウに描画（GUI が遅くても動作を止めない）
+- None: 描画しない（ヘッドレス。matplotlib を import しない）
+- draw / spin / close を持つオブジェクト: そのまま使う
+
+matplotlib はプラグインを作成した時に初めて import する。
+"""
+import math
+import multiprocessing
+import queue
+import time
+
+
+class MatplotlibVisualizer:
+    """matplotlib のウィンドウに描画する"""
+
+    def __init__(self, arm, backend="TkAgg"):
+        """
+        Args:
+            arm: RobotArm（順運動学に使う）
+            backend: matplotlib のバックエンド
+        """
+        import matplotlib
+        matplotlib.use(backend)
+        import matplotlib.pyplot as plt
+
+        self.arm = arm
+        self.plt = plt
+        plt.ion()
+        self.fig, self.ax = plt.subplots()
+        self.status_text = self.ax.text(
+            0.02, 0.98, "G:False",
+            transform=self.ax.transAxes,
+            ha='left', va='top', fontsize=14
+        )
+
+        self.ax.set_aspect('equal')
+        self.ax.set_xlim(-1.2, 1.2)
+        self.ax.set_ylim(-1.2, 1.2)
+        self.arm_line, = self.ax.plot([], [], 'o-', lw=2)
+        self.target_dot, = self.ax.plot([], [], 'rx')
+        self.z_arrow = self.ax.arrow(0, 0, 0, 0, head_width=0.05, color="blue")
+
+    def draw(self, t1, t2, x, y, theta_z, gripping):
+        """
+        アームの姿勢を描画
+
+        Args:
+            t1, t2: 関節角度（ラジアン）
+            x, y: 目標座標
+            theta_z: Z軸回転角度
+            gripping: グリップ中か
+        """
+        p0, p1, p2 = self.arm.fk(t1, t2)
+
+        self.arm_line.set_data([p0[1], p1[1], p2[1]],
+                               [p0[0], p1[0], p2[0]])
+        self.target_dot.set_data([y], [x])
+
+        self.z_arrow.remove()
+        dx = 0.3 * math.sin(theta_z)
+        dy = 0.3 * math.cos(theta_z)
+        self.z_arrow = self.ax.arrow(0, 0, dx, dy, head_width=0.05, color="blue")
+
+        self.status_text.set_text(f"G:{gripping}")
+
+        self.fig.canvas.draw_idle()
+        self.fig.canvas.flush_events()
+        self.plt.pause(0.001)
+
+    def spin(self, duration, stop_event):
+        """ウィンドウをフリーズさせずに待つ"""
+        end_time = time.time() + duration
+        while time.time() < end_time:
+            self.fig.canvas.draw_idle()
+            self.fig.canvas.flush_events()
+            self.plt.pause(0.01)
+            if stop_event.is_set():
+                break
+
+    def close(self):
+        """ウィンドウを閉じるまで表示を続ける"""
+        self.plt.ioff()
+        self.plt.show()
+
+
+class BlitVisualizer:
+    """
+    ブリッティングで描画する
+
+    軸や目盛りなどの静的な背景は一度だけ描いて保存し、アーム・目標点・Z軸の向き・
+    ステータス文字だけを背景の上に描き直す。前回の描画から 1/max_fps 秒以内の
+    呼び出しは描画せず最新の姿勢だけを覚えておき、次の描画（または spin）で反映する。
+    """
+
+    def __init__(self, arm, backend="TkAgg", max_fps=30):
+        """
+        Args:
+            arm: RobotArm（順運動学に使う）
+            backend: matplotlib のバックエンド
+            max_fps: 描画の上限周期。None=制限しない
+        """
+        import matplotlib
+        matplotlib.use(backend)
+        import matplotlib.pyplot as plt
+
+        self.arm = arm
+        self.plt = plt
+        self.period = 1.0 / max_fps if max_fps else 0.0
+        self.pending = None
+        self.last_frame = 0.0
+        self.dropped = 0
+
+        plt.ion()
+        self.fig, self.ax = plt.subplots()
+        self.ax.set_aspect('equal')
+        self.ax.set_xlim(-1.2, 1.2)
+        self.ax.set_ylim(-1.2, 1.2)
+        self.arm_line, = self.ax.plot([], [], 'o-', lw=2, animated=True)
+        self.target_dot, = self.ax.plot([], [], 'rx', animated=True)
+        self.z_line, = self.ax.plot([], [], '-', lw=2, color="blue", animated=True)
+        self.status_text = self.ax.text(
+            0.02, 0.98, "G:False",
+            transform=self.ax.transAxes,
+            ha='left', va='top', fontsize=14, animated=True
+        )
+        self.artists = (self.arm_line, self.target_dot, self.z_line, self.status_text)
+
+        # ウィンドウの再描画（リサイズなど）のたびに背景を取り直す
+        self.background = None
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        plt.show(block=False)
+        plt.pause(0.001)
+
+    def _on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def _render(self):
+        t1, t2, x, y, theta_z, gripping = self.pending
+        self.pending = None
+        p0, p1, p2 = self.arm.fk(t1, t2)
+        self.arm_line.set_data([p0[1], p1[1], p2[1]],
+                               [p0[0], p1[0], p2[0]])
+        self.target_dot.set_data([y], [x])
+        self.z_line.set_data([0, 0.3 * math.sin(theta_z)], [0, 0.3 * math.cos(theta_z)])
+        self.status_text.set_text(f"G:{gripping}")
+
+        canvas = self.fig.canvas
+        if self.background is None:
+            canvas.draw()
+        else:
+            canvas.restore_region(self.background)
+            self._draw_artists()
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+        self.last_frame = time.monotonic()
+
+    def draw(self, t1, t2, x, y, theta_z, gripping):
+        """
+        アームの姿勢を描画（上限 fps を超える分は描画しない）
+
+        Args:
+            t1, t2: 関節角度（ラジアン）
+            x, y: 目標座標
+            theta_z: Z軸回転角度
+            gripping: グリップ中か
+        """
+        if self.pending is not None:
+            self.dropped += 1
+        self.pending = (t1, t2, x, y, theta_z, gripping)
+        if time.monotonic() - self.last_frame >= self.period:
+            self._render()
+
+    def spin(self, duration, stop_event):
+        """描画待ちの姿勢を反映しながら待つ"""
+        end_time = time.monotonic() + duration
+        while not stop_event.is_set():
+            if self.pending is not None and time.monotonic() - self.last_frame >= self.period:
+                self._render()
+            else:
+                self.fig.canvas.flush_events()
+            remaining = end_time - time.monotonic()
+            if remaining <= 0:
+                break
+            stop_event.wait(min(remaining, self.period or 0.02))
+
+    def close(self):
+        """最後の姿勢を描画し、ウィンドウを閉じるまで表示を続ける"""
+        if self.pending is not None:
+            self._render()
+        self.plt.ioff()
+        for artist in self.artists:
+            artist.set_animated(False)
+        self.plt.show()
+
+
+class _LinkModel:
+    """描画プロセス用の順運動学（RobotArm.fk と同じ式）"""
+
+    def __init__(self, l1, l2):
+        self.L1 = l1
+        self.L2 = l2
+
+    def fk(self, t1, t2):
+        x1 = self.L1 * math.cos(t1)
+        y1 = self.L1 * math.sin(t1)
+        x2 = x1 + self.L2 * math.cos(t1 + t2)
+        y2 = y1 + self.L2 * math.sin(t1 + t2)
+        return (0, 0), (x1, y1), (x2, y2)
+
+
+def _viewer_main(states, l1, l2, fps, backend):
+    """描画プロセス: 最新の状態だけを fps で描画する"""
+    view = MatplotlibVisualizer(_LinkModel(l1, l2), backend)
+    period = 1.0 / fps
+    while True:
+        deadline = time.monotonic() + period
+        latest = None
+        while True:
+            try:
+                record = states.get_nowait()
+            except queue.Empty:
+                break
+            if record is None:
+                view.close()
+                return
+            latest = record
+        if not view.plt.fignum_exists(view.fig.number):
+            return
+        if latest is not None:
+            view.draw(*latest)
+        view.plt.pause(max(deadline - time.monotonic(), 0.001))
+
+
+class ProcessVisualizer:
+    """
+    別プロセスのウィンドウに描画する
+
+    姿勢は (t1, t2, x, y, theta_z, gripping) のタプルとしてキューに入れるだけで、
+    描画プロセスは溜まった中から最新の1件を自分の fps で描画する。
+    キューが一杯（描画プロセスが止まっている）なら古い状態を捨てるので、動作側は待たされない。
+    描画プロセスは spawn で起動するため、呼び出し側のスクリプトは
+    if __name__ == "__main__": で守っておくこと。
+    """
+
+    def __init__(self, arm, fps=30, backend="TkAgg", maxsize=64):
+        """
+        Args:
+            arm: RobotArm（リンク長に使う）
+            fps: 描画周期
+            backend: 描画プロセスの matplotlib バックエンド
+            maxsize: 状態キューの上限
+        """
+        # シリアル受信スレッドがあるので fork ではなく spawn で起動する
+        ctx = multiprocessing.get_context("spawn")
+        self.states = ctx.Queue(maxsize)
+        self.dropped = 0
+        self.process = ctx.Process(target=_viewer_main,
+                                   args=(self.states, arm.L1, arm.L2, fps, backend),
+                                   name="arm-viewer")
+        self.process.start()
+
+    def draw(self, t1, t2, x, y, theta_z, gripping):
+        """姿勢を描画プロセスへ送る（待たない）"""
+        record = (float(t1), float(t2), float(x), float(y), float(theta_z), bool(gripping))
+        try:
+            self.states.put_nowait(record)
+        except queue.Full:
+            # 古い状態を1件捨てて最新を入れる（最後の姿勢は必ず届くように）
+            self.dropped += 1
+            try:
+                self.states.get_nowait()
+                self.states.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+
+    def spin(self, duration, stop_event):
+        """描画は別プロセスなので待つだけ"""
+        stop_event.wait(duration)
+
+    def close(self):
+        """描画プロセスに終了を伝える（ウィンドウは閉じるまで残る）"""
+        try:
+            self.states.put(None, timeout=1.0)
+        except queue.Full:
+            self.process.terminate()
+
+
+VISUALIZERS = {
+    'matplotlib': MatplotlibVisualizer,
+    'blit': BlitVisualizer,
+    'process': ProcessVisualizer,
+}
+
+
+def create_visualizer(spec, arm):
+    """
+    描画プラグインを作成
+
+    Args:
+        spec: VISUALIZERS のキー、None、またはプラグインのオブジェクト
+        arm: RobotArm
+
+    Returns:
+        プラグイン。None=ヘッドレス
+    """
+    if spec is None or not isinstance(spec, str):
+        return spec
+    if spec not in VISUALIZERS:
+        raise ValueError(f"unknown visualizer: {spec}")
+    return VISUALIZERS[spec](arm)
@@ -0,0 +1,135 @@
+"""
+手先の直線・円弧経路
+
+経路を一定間隔でサンプリングし、逆運動学で一括変換した関節角度を
+一定周期で逐次送信するための補助関数。
+
+- 手先の速さ ≒ サンプル間隔 × 送信周期
+- サンプル間隔を小さくすると経路に忠実になり、送信周期を上げると速くなる
+  （送信周期はシリアルの帯域とファームウェアの追従性で頭打ちになる）
+"""
+import math
+import time
+
+import numpy as np
+
+from kinematics_batch import ik_batch
+
+
+def line_points(start, end, step):
+    """
+    直線上のサンプル点（始点は含まず終点は含む）
+
+    Args:
+        start, end: (x, y)
+        step: サンプル間隔
+
+    Returns:
+        (N, 2) の座標
+    """
+    if step <= 0:
+        raise ValueError("step must be positive")
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    n = max(1, int(math.ceil(np.hypot(*(end - start)) / step)))
+    u = np.arange(1, n + 1)[:, None] / n
+    return start + u * (end - start)
+
+
+def arc_points(start, end, center, step, ccw=True):
+    """
+    円弧上のサンプル点（始点は含まず終点は含む）
+
+    半径は始点と中心の距離。終点と中心の距離がこれと step 以上違う場合は
+    同じ円上にないので ValueError。
+
+    Args:
+        start, end: (x, y)
+        center: 円弧の中心 (x, y)
+        step: サンプル間隔（弧長）
+        ccw: True=反時計回り
+
+    Returns:
+        (N, 2) の座標
+    """
+    if step <= 0:
+        raise ValueError("step must be positive")
+    cx, cy = center
+    radius = math.hypot(start[0] - cx, start[1] - cy)
+    if abs(math.hypot(end[0] - cx, end[1] - cy) - radius) > step:
+        raise ValueError("arc end point is not on the circle through the start point")
+    a0 = math.atan2(start[1] - cy, start[0] - cx)
+    a1 = math.atan2(end[1] - cy, end[0] - cx)
+    sweep = (a1 - a0) % (2 * math.pi)
+    if not ccw:
+        sweep -= 2 * math.pi
+    n = max(1, int(math.ceil(abs(sweep) * radius / step)))
+    a = a0 + sweep * np.arange(1, n + 1) / n
+    return np.stack([cx + radius * np.cos(a), cy + radius * np.sin(a)], axis=1)
+
+
+def joint_path(points, l1, l2, current):
+    """
+    経路の関節角度
+
+    肘の向きは経路全体で固定し（途中で反転しないように）、現在の姿勢に近い方を選ぶ。
+    第1関節は連続になるよう 2π の不連続を取り除き、現在の角度に最も近い周回に合わせる。
+
+    Args:
+        points: (N, 2) の座標
+        l1, l2: リンク長
+        current: 現在の関節角度 (t1, t2)（rad）
+
+    Returns:
+        (joints, reachable)
+        joints: (N, 2) の関節角度 [t1, t2]
+        reachable: (N,) の到達可能フラグ
+    """
+    sol_a, sol_b, reachable = ik_batch(points, l1, l2)
+    if not reachable.all():
+        return sol_a, reachable
+
+    t1_now, t2_now = current
+
+    def prepare(sol):
+        sol = sol.copy()
+        sol[:, 0] = np.unwrap(sol[:, 0])
+        sol[:, 0] -= 2 * math.pi * round((sol[0, 0] - t1_now) / (2 * math.pi))
+        return sol
+
+    sol_a, sol_b = prepare(sol_a), prepare(sol_b)
+
+    def gap(sol):
+        return abs(sol[0, 0] - t1_now) + abs(sol[0, 1] - t2_now)
+
+    return (sol_a if gap(sol_a) <= gap(sol_b) else sol_b), reachable
+
+
+def paced(items, rate, stop_event=None):
+    """
+    一定周期で要素を取り出すジェネレータ
+
+    締め切り時刻を基準に待つので、送信処理の時間は周期に含まれる。
+    1周期以上遅れた場合は遅れを取り戻そうとせず、そこから周期を数え直す。
+
+    Args:
+        items: 送信する値の列
+        rate: 周期(Hz)
+        stop_event: セットされたら中断する threading.Event
+    """
+    period = 1.0 / rate
+    deadline = time.monotonic()
+    for item in items:
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    return
+            else:
+                time.sleep(delay)
+        elif delay < -period:
+            deadline = time.monotonic()
+        if stop_event is not None and stop_event.is_set():
+            return
+        yield item
+        deadline += period
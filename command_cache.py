@@ -0,0 +1,65 @@
+"""
+最終指令値キャッシュ
+
+軸・速度ごとに最後に送信した値を覚えておき、許容誤差内の再送（と、それに伴う待機）を省く。
+math.radians や逆運動学の丸め誤差で値がわずかに変わっただけの指令もまとめて抑制できる。
+"""
+
+
+class CommandCache:
+    """許容誤差付きの重複コマンド抑制"""
+
+    # 種類ごとの既定許容誤差
+    #   angle: 関節角度(rad)。モータ指令の分解能 0.001 / L1_SCALE より小さい値
+    #   z: Z軸指令値
+    #   speed: 速度設定値
+    DEFAULT_TOLERANCES = {'angle': 1e-4, 'z': 1e-3, 'speed': 1e-6}
+
+    def __init__(self, tolerances=None):
+        """
+        Args:
+            tolerances: 種類 -> 許容誤差 の辞書（省略した種類は既定値）
+        """
+        self.tolerances = dict(self.DEFAULT_TOLERANCES, **(tolerances or {}))
+        self.values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def should_send(self, key, value, kind):
+        """
+        送信が必要か判定する（判定結果をヒット/ミスとして数える）
+
+        Args:
+            key: 軸・設定名 (e.g., 'X', 'S1')
+            value: これから送る値
+            kind: 'angle' / 'z' / 'speed'
+
+        Returns:
+            True=送信が必要、False=前回値と許容誤差内で一致
+        """
+        prev = self.values.get(key)
+        if prev is not None and abs(value - prev) <= self.tolerances[kind]:
+            self.hits += 1
+            return False
+        self.misses += 1
+        return True
+
+    def update(self, key, value):
+        """送信した値を記録"""
+        self.values[key] = value
+
+    def invalidate(self, key=None):
+        """記録を破棄する（None=すべて）。次回は必ず送信される"""
+        if key is None:
+            self.values.clear()
+        else:
+            self.values.pop(key, None)
+
+    def stats(self):
+        """ヒット数・ミス数・ヒット率"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
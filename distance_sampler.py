@@ -0,0 +1,76 @@
+"""
+距離センサのバックグラウンド取得
+
+一定周期で "U" を送り、Z側受信スレッドから届く "UR,<距離>" を時刻付きで
+リングバッファに貯める。get_distance() は最新値を読むだけになり、移動のたびに待たされない。
+"""
+import threading
+import time
+from collections import deque
+
+
+class DistanceSampler:
+    """距離センサ値を周期取得するスレッド"""
+
+    def __init__(self, arm, rate_hz=10.0, history=256):
+        """
+        Args:
+            arm: Z軸・グリッパのシリアルと受信スレッドを持つ RobotArm
+            rate_hz: 取得周期(Hz)
+            history: 保持するサンプル数
+        """
+        self.arm = arm
+        self.period = 1.0 / rate_hz
+        self.samples = deque(maxlen=history)  # (time.monotonic(), 距離)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.arm.readers['z'].subscribe("UR", self._on_reading)
+        self._thread = threading.Thread(target=self._run, name="distance-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.arm.readers['z'].unsubscribe("UR", self._on_reading)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def latest(self, max_age=None):
+        """
+        最新の距離値
+
+        Args:
+            max_age: 許容する経過時間(秒)。これより古ければ None
+
+        Returns:
+            距離値、または None
+        """
+        try:
+            t, value = self.samples[-1]
+        except IndexError:
+            return None
+        if max_age is not None and time.monotonic() - t > max_age:
+            return None
+        return value
+
+    # ---- 取得スレッド ----
+    def _on_reading(self, fields):
+        """受信スレッドから呼ばれる"""
+        try:
+            self.samples.append((time.monotonic(), float(fields[1])))
+        except (IndexError, ValueError):
+            pass
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.arm.request_distance()
+            self._stop.wait(self.period)
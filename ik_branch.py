@@ -0,0 +1,134 @@
+"""
+逆運動学の解の選択
+
+2リンクアームの目標座標には肘の向きが逆の2解 ('a': t2 >= 0, 'b': t2 <= 0) があり、
+さらに第1関節は 2π ずらしても同じ姿勢になる。
+
+- 'legacy': 従来どおり y <= 0 なら 'a'、それ以外は 'b'
+- 'travel': 現在の指令姿勢からの予測移動時間が最短の候補を選ぶ
+    - モータの可動範囲外の候補（arm.MOTOR_LIMITS を校正した場合のみ）、禁止した肘の向きは選ばない
+    - hysteresis 秒以上速くならない限り、現在の肘の向きを保つ
+"""
+import math
+
+import numpy as np
+
+POLICIES = ('legacy', 'travel')
+BRANCHES = ('a', 'b')
+
+# 第1関節を何周ずらした解まで候補にするか（0 を優先）
+TURNS = (0, -1, 1)
+
+
+def within_motor_limits(arm, t1, t2):
+    """
+    関節角度がモータの可動範囲 (arm.MOTOR_LIMITS) 内か
+
+    可動範囲の判定はすべてこの関数で行う（作業領域マップ・解の選択・経路の送信）。
+    MOTOR_LIMITS が None（未校正）なら常に範囲内とする。
+
+    Args:
+        arm: initialize 済みの RobotArm
+        t1, t2: 関節角度（ラジアン）。スカラーまたは NumPy 配列
+
+    Returns:
+        bool（配列なら要素ごとの bool 配列）
+    """
+    if arm.MOTOR_LIMITS is None:
+        return np.full(np.shape(t1), True)
+    m1 = (t1 - arm.t1_initial) * arm.L1_SCALE
+    m2 = (t2 - arm.t2_initial) * arm.L2_SCALE
+    (lo1, hi1), (lo2, hi2) = arm.MOTOR_LIMITS['X'], arm.MOTOR_LIMITS['Y']
+    return (m1 >= lo1) & (m1 <= hi1) & (m2 >= lo2) & (m2 <= hi2)
+
+
+class BranchSelector:
+    """逆運動学の解を選ぶ"""
+
+    def __init__(self, arm, policy='legacy', hysteresis=0.1, forbidden=()):
+        """
+        Args:
+            arm: RobotArm
+            policy: 'legacy' / 'travel'
+            hysteresis: 肘の向きを変えるのに必要な短縮時間(秒)
+            forbidden: 使わない肘の向き ('a' / 'b') の集合
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"unknown ik policy: {policy}")
+        for branch in forbidden:
+            if branch not in BRANCHES:
+                raise ValueError(f"unknown branch: {branch}")
+        self.arm = arm
+        self.policy = policy
+        self.hysteresis = hysteresis
+        self.forbidden = set(forbidden)
+        self.solves = 0
+        self.flips = 0
+        self.flips_saved = 0
+        self.time_saved = 0.0
+
+    def _cost(self, current, t1, t2):
+        return self.arm.joint_travel_time(t1 - current[0], t2 - current[1])
+
+    @staticmethod
+    def branch_of(t2):
+        """肘の向き"""
+        return 'a' if t2 >= 0 else 'b'
+
+    def select(self, x, y, solutions, current):
+        """
+        解を選ぶ
+
+        Args:
+            x, y: 目標座標
+            solutions: ik_both の結果 ((a1, a2), (b1, b2))
+            current: 現在の指令姿勢 (t1, t2)。None=未初期化
+
+        Returns:
+            (t1, t2)
+
+        Raises:
+            ValueError: 可動範囲内の解が無い
+        """
+        (a1, a2), (b1, b2) = solutions
+        legacy = (a1, a2) if y <= 0 else (b1, b2)
+        if self.policy == 'legacy' or current is None or self.arm.t1_initial is None:
+            return legacy
+
+        candidates = []
+        for branch, (t1, t2) in zip(BRANCHES, solutions):
+            if branch in self.forbidden:
+                continue
+            for k in TURNS:
+                c1 = t1 + 2 * math.pi * k
+                if within_motor_limits(self.arm, c1, t2):
+                    candidates.append((self._cost(current, c1, t2), branch, c1, t2))
+        if not candidates:
+            raise ValueError("no solution within joint limits")
+
+        best = min(candidates)
+        here = self.branch_of(current[1])
+        same = [c for c in candidates if c[1] == here]
+        if best[1] != here and same and min(same)[0] - best[0] < self.hysteresis:
+            best = min(same)
+
+        # 統計: 従来の規則と比べて肘の反転を避けられたか
+        self.solves += 1
+        legacy_branch = self.branch_of(legacy[1])
+        if best[1] != here:
+            self.flips += 1
+        elif legacy_branch != here:
+            self.flips_saved += 1
+        if within_motor_limits(self.arm, *legacy):
+            self.time_saved += max(0.0, self._cost(current, *legacy) - best[0])
+        return best[2], best[3]
+
+    def stats(self):
+        """選択回数・肘の反転回数・避けた反転回数・短縮した予測時間(秒)"""
+        return {
+            'policy': self.policy,
+            'solves': self.solves,
+            'flips': self.flips,
+            'flips_saved': self.flips_saved,
+            'time_saved': self.time_saved,
+        }
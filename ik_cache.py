@@ -0,0 +1,153 @@
+"""
+逆運動学のキャッシュ
+
+- 完全一致メモ: 同じ目標座標・同じプリセット角度は2回目以降は表引き
+- 事前計算グリッド（任意）: 到達可能な円環上の解を .npy に保存しておき補間で求める
+
+2リンクアームの解は回転対称で、目標の極座標 (r, φ) に対して
+    t2 = ±t2(r),  t1 = φ - (±β(r))
+となる。そのため円環全体のグリッドは半径方向の1次元表 (r, t2, β) に帰着でき、
+φ は atan2 で厳密に扱う。表の各区間には補間したときの手先位置の最大誤差を
+記録しておき、誤差が許容値を超える区間（特異点付近）は厳密計算に戻す。
+"""
+import math
+import os
+
+
+class IKGrid:
+    """半径方向の逆運動学テーブル"""
+
+    # 区間内で誤差を評価する点の数
+    ERROR_SAMPLES = 8
+
+    def __init__(self, table):
+        """
+        Args:
+            table: (n, 4) の配列 [r, t2(r), β(r), 区間 [r_i, r_i+1] の最大手先誤差]
+        """
+        rows = [list(map(float, row)) for row in table]
+        self.r = [row[0] for row in rows]
+        self.t2 = [row[1] for row in rows]
+        self.beta = [row[2] for row in rows]
+        self.err = [row[3] for row in rows]
+        self.r0 = self.r[0]
+        self.dr = (self.r[-1] - self.r[0]) / (len(self.r) - 1)
+
+    @staticmethod
+    def _exact(r, l1, l2):
+        c2 = max(-1.0, min(1.0, (r * r - l1 * l1 - l2 * l2) / (2 * l1 * l2)))
+        t2 = math.acos(c2)
+        return t2, math.atan2(l2 * math.sin(t2), l1 + l2 * c2)
+
+    @classmethod
+    def build(cls, l1, l2, size=4096):
+        """
+        テーブルを計算する
+
+        Args:
+            l1, l2: リンク長
+            size: 半径方向の分割数
+        """
+        import numpy as np
+
+        r = np.linspace(abs(l1 - l2), l1 + l2, size)
+        exact = [cls._exact(ri, l1, l2) for ri in r]
+        t2 = np.array([e[0] for e in exact])
+        beta = np.array([e[1] for e in exact])
+
+        # 区間内の数点で、補間解の手先位置と目標 (r, 0) の距離を測る
+        err = np.zeros(size)
+        for k in range(1, cls.ERROR_SAMPLES + 1):
+            u = k / (cls.ERROR_SAMPLES + 1)
+            rm = r[:-1] + u * (r[1:] - r[:-1])
+            t2m = t2[:-1] + u * (t2[1:] - t2[:-1])
+            t1m = -(beta[:-1] + u * (beta[1:] - beta[:-1]))
+            x = l1 * np.cos(t1m) + l2 * np.cos(t1m + t2m)
+            y = l1 * np.sin(t1m) + l2 * np.sin(t1m + t2m)
+            err[:-1] = np.maximum(err[:-1], np.hypot(x - rm, y))
+        return cls(np.stack([r, t2, beta, err], axis=1))
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+        return cls(np.load(path))
+
+    def save(self, path):
+        import numpy as np
+        np.save(path, np.array([self.r, self.t2, self.beta, self.err]).T)
+
+    @classmethod
+    def load_or_build(cls, path, l1, l2, size=4096):
+        """保存済みなら読み込み、無ければ計算して保存する"""
+        if os.path.exists(path):
+            return cls.load(path)
+        grid = cls.build(l1, l2, size)
+        grid.save(path)
+        return grid
+
+    def lookup(self, x, y, tolerance):
+        """
+        補間で両解を求める
+
+        Returns:
+            ((a1, a2), (b1, b2))。範囲外または誤差が tolerance を超える区間なら None
+        """
+        r = math.hypot(x, y)
+        i = int((r - self.r0) / self.dr)
+        if i < 0 or i >= len(self.r) - 1 or self.err[i] > tolerance:
+            return None
+        u = (r - self.r[i]) / self.dr
+        t2 = self.t2[i] + u * (self.t2[i + 1] - self.t2[i])
+        beta = self.beta[i] + u * (self.beta[i + 1] - self.beta[i])
+        phi = math.atan2(y, x)
+        return (phi - beta, t2), (phi + beta, -t2)
+
+
+class IKCache:
+    """逆運動学の結果を再利用する"""
+
+    def __init__(self, solver, grid=None, tolerance=1e-4, digits=9, maxsize=4096):
+        """
+        Args:
+            solver: 厳密解 solver(x, y) -> ((a1, a2), (b1, b2))。到達不可能なら ValueError
+            grid: IKGrid（None=グリッドを使わない）
+            tolerance: グリッド補間で許容する手先位置の誤差
+            digits: メモのキーに使う座標の丸め桁数
+            maxsize: メモの上限件数（超えたら破棄して作り直す）
+        """
+        self.solver = solver
+        self.grid = grid
+        self.tolerance = tolerance
+        self.digits = digits
+        self.maxsize = maxsize
+        self.memo = {}
+        self.presets = {}
+        self.hits = 0
+        self.misses = 0
+
+    def solve(self, x, y):
+        """両解を求める（メモ → グリッド → 厳密解の順）"""
+        key = (round(x, self.digits), round(y, self.digits))
+        result = self.memo.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = None
+        if self.grid is not None:
+            result = self.grid.lookup(x, y, self.tolerance)
+        if result is None:
+            result = self.solver(x, y)
+        if len(self.memo) >= self.maxsize:
+            self.memo.clear()
+        self.memo[key] = result
+        return result
+
+    def preset_radians(self, t1_deg, t2_deg):
+        """プリセット角度(度)のラジアン変換を再利用"""
+        key = (t1_deg, t2_deg)
+        result = self.presets.get(key)
+        if result is None:
+            result = self.presets[key] = (math.radians(t1_deg), math.radians(t2_deg))
+        return result
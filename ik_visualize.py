@@ -1,6 +1,7 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
+from kinematics_batch import ik_batch
 
 # ---- パラメータ ----
 L1 = 0.5
@@ -8,16 +9,11 @@ L2 = 0.5
 
 # ---- 逆運動学 ----
 def inverse_kinematics(x, y):
-    r2 = x*x + y*y
-    c2 = (r2 - L1*L1 - L2*L2) / (2*L1*L2)
-
-    if c2 < -1.0 or c2 > 1.0:
+    sol_a, _, reachable = ik_batch([[x, y]], L1, L2)
+    if not reachable[0]:
         return None
 
-    theta2 = np.arccos(c2)
-    s2 = np.sin(theta2)
-    theta1 = np.arctan2(y, x) - np.arctan2(L2*s2, L1 + L2*c2)
-
+    theta1, theta2 = sol_a[0]
     return theta1, theta2
 
 # ---- 描画初期化 ----
@@ -0,0 +1,64 @@
+"""
+2リンクアームの一括運動学（NumPy）
+
+RobotArm.ik_both / fk と同じ式を N 点まとめて計算する。
+軌道のサンプリングや作業領域マップなど、大量の点を扱う処理で使う。
+"""
+import numpy as np
+
+
+def ik_batch(points, l1=0.5, l2=0.5):
+    """
+    逆運動学の両解を一括で求める
+
+    Args:
+        points: (N, 2) の目標座標 [x, y]
+        l1, l2: リンク長
+
+    Returns:
+        (sol_a, sol_b, reachable)
+        sol_a, sol_b: (N, 2) の関節角度 [t1, t2]（rad）。sol_a は t2 >= 0 側
+                      （RobotArm.ik_both の1番目・2番目の解に対応）
+        reachable: (N,) の到達可能フラグ。到達不可能な点の解は NaN
+    """
+    p = np.asarray(points, dtype=float).reshape(-1, 2)
+    x, y = p[:, 0], p[:, 1]
+    r2 = x * x + y * y
+    r = np.sqrt(r2)
+    reachable = (r <= l1 + l2) & (r >= abs(l1 - l2))
+
+    c2 = np.clip((r2 - l1 * l1 - l2 * l2) / (2 * l1 * l2), -1.0, 1.0)
+    s = np.sqrt(1.0 - c2 * c2)
+    k1 = l1 + l2 * c2
+    base = np.arctan2(y, x)
+
+    t2a = np.arctan2(s, c2)
+    t1a = base - np.arctan2(l2 * s, k1)
+    t1b = base - np.arctan2(-l2 * s, k1)
+
+    sol_a = np.stack([t1a, t2a], axis=1)
+    sol_b = np.stack([t1b, -t2a], axis=1)
+    sol_a[~reachable] = np.nan
+    sol_b[~reachable] = np.nan
+    return sol_a, sol_b, reachable
+
+
+def fk_batch(joints, l1=0.5, l2=0.5):
+    """
+    順運動学を一括で求める
+
+    Args:
+        joints: (N, 2) の関節角度 [t1, t2]（rad）
+        l1, l2: リンク長
+
+    Returns:
+        (N, 3, 2) のリンク位置 [根元, 肘, 手先] x [x, y]
+    """
+    q = np.asarray(joints, dtype=float).reshape(-1, 2)
+    t1, t12 = q[:, 0], q[:, 0] + q[:, 1]
+    out = np.zeros((len(q), 3, 2))
+    out[:, 1, 0] = l1 * np.cos(t1)
+    out[:, 1, 1] = l1 * np.sin(t1)
+    out[:, 2, 0] = out[:, 1, 0] + l2 * np.cos(t12)
+    out[:, 2, 1] = out[:, 1, 1] + l2 * np.sin(t12)
+    return out
@@ -4,6 +4,7 @@
 import threading
 import keyboard
 from robot_arm_class import RobotArm
+from task_order import Job, order_jobs, preset_matrix
 
 
 def key_loop(robot):
@@ -26,36 +27,25 @@ def pick_and_place(robot):
     """ピック&プレイス動作"""
     print("ピック&プレイス開始...")
     
+    # 全シーンを1つのシーケンスにまとめ、重複する経由点を省いて実行
+    seq = robot.sequence()
+    
     # ホームポジション
-    robot.move_to_angle(*robot.POSITIONS['home'], should_grip=False)
+    seq.preset('home', grip=False)
     
-    # シーン1: つかんで5番に置く
-    robot.grab_at("feeder")
-    robot.move_to_angle(*robot.POSITIONS['pos_5'], should_grip=True)
-    robot.place_at("pos_5")
-
-    # シーン2: つかんで4番に置く
-    robot.grab_at("feeder")
-    robot.move_to_angle(*robot.POSITIONS['pos_4'], should_grip=True)
-    robot.place_at("pos_4")
-
-    # シーン3: つかんで3番に置く
-    robot.grab_at("feeder")
-    robot.move_to_angle(*robot.POSITIONS['pos_3'], should_grip=True)
-    robot.place_at("pos_3")
-
-    # シーン4: つかんで2番に置く
-    robot.grab_at("feeder")
-    robot.move_to_angle(*robot.POSITIONS['pos_2'], should_grip=True)
-    robot.place_at("pos_2")
-
-    # シーン5: つかんで1番に置く
-    robot.grab_at("feeder")
-    robot.move_to_angle(*robot.POSITIONS['pos_1'], should_grip=True)
-    robot.place_at("pos_1")
+    # シーン1～5: フィーダからつかんで各位置に置く
+    # 置く順番は移動時間の合計が最小になるように決める
+    jobs = [Job(pos, 'feeder', f'pos_{pos}') for pos in (5, 4, 3, 2, 1)]
+    order = order_jobs(jobs, 'home', preset_matrix(robot), end='home')
+    for pos in [job.name for job in order]:
+        seq.grab("feeder")
+        seq.preset(f'pos_{pos}', grip=True)
+        seq.place(f'pos_{pos}')
     
     # ホームに戻す
-    robot.move_to_angle(*robot.POSITIONS['home'], should_grip=False)
+    seq.preset('home', grip=False)
+    
+    seq.run()
     
     print("ピック&プレイス完了")
 
@@ -69,13 +59,14 @@ def pp2(robot,speed,angle):
 def main():
     """メイン処理"""
     # ロボットアーム初期化
-    robot = RobotArm(port_xy="COM5", port_z="COM10")
+    robot = RobotArm(port_xy="COM5", port_z="COM10", visualizer="blit")
     
     # 初期姿勢を設定
     robot.initialize(x0=0.5, y0=-0.5, z0=0.0)
-    robot.set_t1_speed(4.0)
-    robot.set_t2_speed(4.0)
-    robot.set_z_speed(4.0)
+    with robot.batch():
+        robot.set_t1_speed(4.0)
+        robot.set_t2_speed(4.0)
+        robot.set_z_speed(4.0)
     
     # キーボード監視スレッド開始
     threading.Thread(target=key_loop, args=(robot,), daemon=True).start()
@@ -0,0 +1,116 @@
+"""
+ロボットアームの非同期動作キュー
+
+専用スレッドがシリアルポートを占有し、投入された動作を投入順に1つずつ実行する。
+呼び出し側は Future を受け取り、動作中にカード認識やUI更新を進められる。
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class MotionQueue:
+    """動作を順番に実行する専用スレッド"""
+
+    def __init__(self, arm):
+        """
+        Args:
+            arm: 動作を実行する RobotArm
+        """
+        self.arm = arm
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._run, name="motion-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, move, *args, callback=None, **kwargs):
+        """
+        動作をキューに投入する
+
+        Args:
+            move: 呼び出し可能オブジェクト、または RobotArm のメソッド名 (e.g., 'grab_at')
+            *args, **kwargs: 動作に渡す引数
+            callback: 完了時に Future を引数に呼ばれる関数
+
+        Returns:
+            動作の戻り値（または例外）を保持する Future
+
+        Raises:
+            RuntimeError: shutdown() 後に呼ばれた
+        """
+        if isinstance(move, str):
+            move = getattr(self.arm, move)
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        with self._idle:
+            if self._shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            self._pending += 1
+            self._queue.put((future, move, args, kwargs))
+        return future
+
+    def wait_all(self, timeout=None):
+        """
+        投入済みの動作がすべて終わるまで待つ
+
+        Returns:
+            True=全動作完了、False=タイムアウト
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def cancel_pending(self):
+        """未着手の動作を取り消す（実行中の動作は止めない）"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[0].cancel()
+                self._done()
+
+    def in_worker(self):
+        """呼び出し元が動作スレッド自身か"""
+        return threading.current_thread() is self._thread
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """
+        動作スレッドを停止する
+
+        Args:
+            wait: True=スレッド終了まで待つ
+            cancel_pending: True=未着手の動作を取り消す
+        """
+        with self._idle:
+            first = not self._shutdown
+            self._shutdown = True
+        if cancel_pending:
+            self.cancel_pending()
+        if first:
+            self._queue.put(None)
+        if wait and not self.in_worker():
+            self._thread.join()
+
+    # ---- 動作スレッド ----
+    def _done(self):
+        with self._idle:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, move, args, kwargs = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(move(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            self._done()
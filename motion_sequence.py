@@ -0,0 +1,141 @@
+"""
+動作シーケンスの組み立てと最適化
+
+grab_at / place_at などのタスクを「姿勢へ移動してからグリップ状態を設定する」
+基本動作の列として組み立て、実行前に次の最適化をかける。
+
+- 直前の状態と姿勢・グリップが同じ経由点は削除する
+- 同じXY位置でZだけを動かし、グリップも変えない経由点は、次の動作（同じXY・同じグリップ）に統合する
+  （グリップは移動後に行うので、次の動作でグリップを変える場合に統合するとグリップする高さが変わる）
+
+XYが変わる移動の前後にある上昇・下降の経由点は、干渉回避のため残す。
+"""
+import math
+
+# 姿勢を同一とみなす誤差(度)
+POSE_TOLERANCE = 1e-6
+
+
+class MotionStep:
+    """基本動作: 角度指定で移動し、グリップ状態を設定する"""
+
+    def __init__(self, t1_deg, t2_deg, z, grip, label=None):
+        self.t1_deg = t1_deg
+        self.t2_deg = t2_deg
+        self.z = z
+        self.grip = grip
+        self.label = label
+
+    def same_xy(self, other):
+        return (abs(self.t1_deg - other.t1_deg) <= POSE_TOLERANCE
+                and abs(self.t2_deg - other.t2_deg) <= POSE_TOLERANCE)
+
+    def same_pose(self, other):
+        return self.same_xy(other) and abs(self.z - other.z) <= POSE_TOLERANCE
+
+    def __repr__(self):
+        return (f"MotionStep({self.t1_deg}, {self.t2_deg}, {self.z}, "
+                f"grip={self.grip}, label={self.label!r})")
+
+
+class MotionSequence:
+    """基本動作の列"""
+
+    def __init__(self, arm):
+        """
+        Args:
+            arm: 実行する RobotArm
+        """
+        self.arm = arm
+        self.steps = []
+
+    # ---- 組み立て ----
+    def move_angle(self, t1_deg, t2_deg, z, grip, label=None):
+        """角度指定の移動を追加"""
+        self.steps.append(MotionStep(t1_deg, t2_deg, z, grip, label))
+        return self
+
+    def preset(self, pos_key, grip, grab=False):
+        """
+        プリセット位置への移動を追加
+
+        Args:
+            pos_key: 位置キー (e.g., 'pos_1', 'feeder')
+            grip: 移動後のグリップ状態
+            grab: True=つかむ高さ (POSITIONS_GRAB)
+        """
+        table = self.arm.POSITIONS_GRAB if grab else self.arm.POSITIONS
+        label = f"{pos_key}{'(grab)' if grab else ''}"
+        return self.move_angle(*table[pos_key], grip, label=label)
+
+    def grab(self, pos_key):
+        """上から下へ移動してつかみ、上に戻る"""
+        return (self.preset(pos_key, False)
+                .preset(pos_key, True, grab=True)
+                .preset(pos_key, True))
+
+    def place(self, pos_key):
+        """上から下へ移動して離し、上に戻る"""
+        return (self.preset(pos_key, True)
+                .preset(pos_key, False, grab=True)
+                .preset(pos_key, False))
+
+    # ---- 最適化 ----
+    def _current_state(self):
+        """アームの現在の指令状態（グリップ不明時は None）"""
+        arm = self.arm
+        grip = {'closed': True, 'open': False}.get(arm.grip_state)
+        return MotionStep(math.degrees(arm.sent_prev_t1), math.degrees(arm.sent_prev_t2),
+                          arm.sent_prev_z, grip, label='current')
+
+    @staticmethod
+    def _drop_noops(steps, state):
+        out = []
+        for step in steps:
+            if step.same_pose(state) and step.grip == state.grip:
+                continue
+            out.append(step)
+            state = step
+        return out
+
+    @staticmethod
+    def _fuse_z_moves(steps, state):
+        out = []
+        for i, step in enumerate(steps):
+            nxt = steps[i + 1] if i + 1 < len(steps) else None
+            if (nxt is not None and step.grip == state.grip and nxt.grip == step.grip
+                    and step.same_xy(state) and step.same_xy(nxt)):
+                # Zだけの経由点: 次の動作に統合
+                # （次の動作でグリップを変える場合は、その高さまで降りてから
+                #   グリップするので統合しない）
+                continue
+            out.append(step)
+            state = step
+        return out
+
+    def compile(self):
+        """
+        実行する動作列を求める
+
+        Returns:
+            最適化後の MotionStep のリスト
+        """
+        state = self._current_state()
+        steps = list(self.steps)
+        while True:
+            optimized = self._fuse_z_moves(self._drop_noops(steps, state), state)
+            if len(optimized) == len(steps):
+                return optimized
+            steps = optimized
+
+    def run(self):
+        """
+        最適化した動作列を実行
+
+        Returns:
+            実行した MotionStep のリスト
+        """
+        steps = self.compile()
+        for step in steps:
+            self.arm.move_to_angle(step.t1_deg, step.t2_deg, step.z, should_grip=step.grip)
+        return steps
@@ -17,6 +17,7 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(SCRIPT_DIR)
 sys.path.append(ROOT_DIR)
 from robot_arm_class import RobotArm
+from task_order import Job, order_jobs, preset_matrix
 
 # Path to the hand file written by the card reader server
 HAND_FILE = os.path.join(ROOT_DIR, 'robotics_arm', 'yolo_card_reader', 'latest_hand.json')
@@ -24,6 +25,9 @@ HAND_FILE = os.path.join(ROOT_DIR, 'robotics_arm', 'yolo_card_reader', 'latest_h
 # Position for discarding cards
 DISCARD_POS = (0.5, 0.0, 0)
 
+# Confirm the next card in the feeder while the previous one is being placed
+PIPELINED_DEAL = True
+
 # Card rank values for comparison
 RANK_VALUES = {2: 2, 3: 3, 4: 4, 5: 5, 6: 6, 7: 7, 8: 8, 9: 9, 10: 10, 11: 11, 12: 12, 13: 13, 14: 14}
 
@@ -114,8 +118,17 @@ def place_card_at_position(robot, position_num):
 
 def move_card_between_positions(robot, from_pos, to_pos):
     """Move card from one position to another."""
-    robot.grab_at(f'pos_{from_pos}')
-    robot.place_at(f'pos_{to_pos}')
+    robot.sequence().grab(f'pos_{from_pos}').place(f'pos_{to_pos}').run()
+
+
+def order_exchange_positions(robot, positions):
+    """
+    交換する位置をアームの移動時間が短くなる順に並べ替える
+    （各交換は同じ位置で始まり同じ位置で終わる）
+    """
+    here = robot.current_pose()
+    jobs = [Job(p, f'pos_{p}') for p in positions]
+    return [job.name for job in order_jobs(jobs, here, preset_matrix(robot, [here]))]
 
 
 def discard_card(robot):
@@ -257,11 +270,12 @@ def main():
     print()
     
     # Initialize robot
-    robot = RobotArm(port_xy="COM5", port_z="COM10")
+    robot = RobotArm(port_xy="COM5", port_z="COM10", distance_rate=10, visualizer="process")
     robot.initialize(x0=0.5, y0=-0.5, z0=0.0)
-    robot.set_t1_speed(4.0)
-    robot.set_t2_speed(4.0)
-    robot.set_z_speed(4.0)
+    with robot.batch():
+        robot.set_t1_speed(4.0)
+        robot.set_t2_speed(4.0)
+        robot.set_z_speed(4.0)
     
     try:
         hand = []
@@ -274,14 +288,20 @@ def main():
         print("フィーダから5枚のカードを取得します")
         print()
         
+        placing = None
         for card_num in range(1, 6):
             print(f"\n--- カード {card_num}/5 ---")
             
             # Wait for card to be in feeder (distance <= 10 for 5 seconds)
+            # (runs while the previous card is still being placed)
             if not wait_for_card_in_feeder(robot, required_duration=5.0):
                 print(f"タイムアウト: カード{card_num}を検出できませんでした")
                 return
             
+            # The arm goes back to the feeder only after the previous placement
+            if placing is not None:
+                placing.result()
+            
             # Fetch card from feeder
             fetch_card_from_feeder(robot)
             
@@ -295,8 +315,14 @@ def main():
             print(f"読み込まれたカード: {card_to_string(detected_card)}")
             
             # Place card at position
-            place_card_at_position(robot, card_num)
-            time.sleep(0.5)
+            if PIPELINED_DEAL:
+                placing = robot.submit(place_card_at_position, robot, card_num)
+            else:
+                place_card_at_position(robot, card_num)
+                time.sleep(0.5)
+        
+        if placing is not None:
+            placing.result()
         
         # Show initial hand
         print_hand(hand, "取得した手札")
@@ -329,7 +355,7 @@ def main():
                 break
             
             # For each position to exchange, get new card from feeder
-            for pos in positions_to_exchange:
+            for pos in order_exchange_positions(robot, positions_to_exchange):
                 print(f"\n位置{pos}のカードを入れ替えます")
                 
                 # Discard current card at position
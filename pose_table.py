@@ -0,0 +1,143 @@
+"""
+プリセット姿勢の事前計算表
+
+initialize() の後に一度だけ作成し、プリセット位置 (POSITIONS / POSITIONS_GRAB) の
+- 関節角度（ラジアン）と手先座標
+- モータ指令値
+- 送信するコマンドのバイト列（ASCII プロトコルのみ。バイナリは通し番号があるため都度生成）
+- プリセット位置間のXY移動の予測時間
+を保持する。プリセットへの移動は表引きと write だけになる。
+
+プリセット位置は校正ファイル（JSON）から読み込むこともできる:
+
+    {
+        "positions":      {"home": [-90, 90, 0], "pos_1": [-70, 70, 0], ...},
+        "positions_grab": {"home": [-90, 90, -8.7], ...}
+    }
+"""
+import json
+import math
+
+from serial_protocol import encode_ascii
+
+
+def load_calibration(path, positions, positions_grab):
+    """
+    校正ファイルを読み込む
+
+    Args:
+        path: JSON ファイルのパス
+        positions, positions_grab: 既定のプリセット位置（ファイルに無いキーはこれを使う）
+
+    Returns:
+        (positions, positions_grab)
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    merged = []
+    for name, default in (("positions", positions), ("positions_grab", positions_grab)):
+        table = dict(default)
+        for key, pose in data.get(name, {}).items():
+            if len(pose) != 3:
+                raise ValueError(f"{name}.{key}: expected [t1_deg, t2_deg, z]")
+            table[key] = tuple(float(v) for v in pose)
+        merged.append(table)
+    return merged[0], merged[1]
+
+
+def save_calibration(path, positions, positions_grab):
+    """プリセット位置を校正ファイルに書き出す"""
+    data = {
+        "positions": {k: list(v) for k, v in positions.items()},
+        "positions_grab": {k: list(v) for k, v in positions_grab.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+class CompiledXY:
+    """XY関節の事前計算値"""
+
+    def __init__(self, t1, t2, tip, v1, v2, data):
+        self.t1 = t1
+        self.t2 = t2
+        self.tip = tip
+        self.v1 = v1
+        self.v2 = v2
+        self.data = data  # {'X': bytes, 'Y': bytes, 'XY': bytes}。バイナリでは None
+
+
+class CompiledZ:
+    """Z軸の事前計算値"""
+
+    def __init__(self, z, vz, data):
+        self.z = z
+        self.vz = vz
+        self.data = data  # bytes。バイナリでは None
+
+
+class PoseTable:
+    """プリセット姿勢の表"""
+
+    def __init__(self, arm):
+        """
+        Args:
+            arm: initialize 済みの RobotArm
+        """
+        self.arm = arm
+        self.xy = {}
+        self.z = {}
+        self.keys = {}
+        self._travel = {}
+        self.compile()
+
+    def compile(self):
+        """arm の現在のプリセット位置・初期姿勢・プロトコルで作り直す"""
+        arm = self.arm
+        ascii_ = arm.protocol == 'ascii'
+        self.xy.clear()
+        self.z.clear()
+        self.keys.clear()
+        self._travel.clear()
+        for table in (arm.POSITIONS, arm.POSITIONS_GRAB):
+            for key, (t1_deg, t2_deg, z) in table.items():
+                self.keys.setdefault(key, (t1_deg, t2_deg))
+                if (t1_deg, t2_deg) not in self.xy:
+                    t1, t2 = math.radians(t1_deg), math.radians(t2_deg)
+                    v1 = (t1 - arm.t1_initial) * arm.L1_SCALE
+                    v2 = (t2 - arm.t2_initial) * arm.L2_SCALE
+                    data = None
+                    if ascii_:
+                        data = {'X': encode_ascii('X', v1), 'Y': encode_ascii('Y', v2),
+                                'XY': encode_ascii('XY', v1, v2)}
+                    self.xy[(t1_deg, t2_deg)] = CompiledXY(t1, t2, arm.fk(t1, t2)[2],
+                                                           v1, v2, data)
+                if z not in self.z:
+                    vz = z * arm.LL_SCALE
+                    self.z[z] = CompiledZ(z, vz, encode_ascii('Z', vz, 0) if ascii_ else None)
+
+    def invalidate_travel(self):
+        """速度設定が変わったら移動時間を計算し直す"""
+        self._travel.clear()
+
+    def travel_time(self, from_key, to_key):
+        """
+        プリセット位置間のXY移動の予測時間(秒)
+
+        Returns:
+            秒。表に無いキーなら None
+        """
+        pair = (from_key, to_key)
+        result = self._travel.get(pair)
+        if result is None:
+            a = self.keys.get(from_key)
+            b = self.keys.get(to_key)
+            if a is None or b is None:
+                return None
+            result = self._travel[pair] = self.arm.joint_travel_time(
+                math.radians(b[0] - a[0]), math.radians(b[1] - a[1]))
+        return result
+
+    def transitions(self):
+        """全プリセット位置間の移動時間 {(from, to): 秒}"""
+        return {(a, b): self.travel_time(a, b) for a in self.keys for b in self.keys}
@@ -1,7 +1,33 @@
-import serial, math, time, threading
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use("TkAgg")
+import serial, math, time, threading, contextlib
+from trajectory_timing import JointTimingModel
+from motion_queue import MotionQueue
+from distance_sampler import DistanceSampler
+from serial_reader import SerialLineReader
+from serial_protocol import FrameEncoder, FrameDecoder, encode_ascii
+from command_cache import CommandCache
+from motion_sequence import MotionSequence
+from ik_cache import IKCache, IKGrid
+from ik_branch import BranchSelector
+from pose_table import PoseTable, load_calibration
+from arm_visualizer import create_visualizer
+
+
+class MotionCancelled(RuntimeError):
+    """停止要求 (RobotArm.stop / close) で動作が中断された"""
+
+
+class _StopEvent(threading.Event):
+    """set() で RobotArm の待機 (_motion_cond) も起こす停止要求"""
+
+    def __init__(self, cond):
+        super().__init__()
+        # threading.Event が内部で使う self._cond とは別の名前にする
+        self._motion_cond = cond
+
+    def set(self):
+        super().set()
+        with self._motion_cond:
+            self._motion_cond.notify_all()
 
 
 class RobotArm:
@@ -34,47 +60,160 @@ class RobotArm:
         'feeder': (-90, 0, -8.7),
     }
     
-    def __init__(self, port_xy="COM5", port_z="COM10"):
+    # ---- 動作完了通知 ----
+    # ファームウェアは各軸の移動完了時に "DONE,<軸>" を1行送信する（グリッパは "DONE,G"）
+    MOTION_AXES = ('X', 'Y', 'Z', 'G')
+    
+    # ---- 完了通知の待機上限 ----
+    # motion_feedback=True のときの待機上限 = 予測移動時間 x FACTOR + MIN(秒)
+    # 予測は推定した加速度を使うので、過小評価しても次の軸を早く送らないよう大きめにとる
+    FEEDBACK_TIMEOUT_FACTOR = 3.0
+    FEEDBACK_TIMEOUT_MIN = 2.0
+    
+    # ---- 完了通知なしの待機下限 ----
+    # 移動時間予測の加速度は実測値ではないので、timing_accels を与えるまでは
+    # 従来の固定待機 (XY: BASE + SCALE*(関節の最大変化量/π - 0.5)、Z: 固定) を下回らない
+    BASELINE_WAIT_XY = 2.5
+    BASELINE_WAIT_XY_SCALE = 2.0
+    BASELINE_WAIT_Z = 2.0
+    
+    # ---- グリッパ ----
+    # 開閉にかかる時間(秒)。完了通知が無い場合はこの時間だけ待つ
+    GRIP_ACTUATION_TIME = 1.0
+    # 完了通知が無い場合に、移動後グリッパを動かす前に待つ整定時間(秒)
+    SETTLE_TIME = 0.5
+    
+    # ---- 同時動作 ----
+    # 移動前後とも |z| がこの値以下ならZ移動をXY移動と重ねても干渉しない
+    Z_OVERLAP_LIMIT = 2.0
+    
+    # ---- 距離センサ ----
+    # バックグラウンド取得時、これより古い値は無効(秒)
+    DISTANCE_MAX_AGE = 0.5
+    
+    # ---- 可動範囲 ----
+    # モータ指令値の範囲（初期姿勢=0）。None=未校正で判定しない
+    # 実機で測った値を {'X': (下限, 上限), 'Y': (下限, 上限)} で設定する
+    MOTOR_LIMITS = None
+    # 手先を入れてはいけない領域 ('circle', cx, cy, r) / ('rect', xmin, ymin, xmax, ymax)
+    FORBIDDEN_ZONES = []
+    
+    def __init__(self, port_xy="COM5", port_z="COM10", motion_feedback=False,
+                 concurrent_axes=False, timing_profile='trapezoid', wait_margin=0.3,
+                 distance_rate=None, protocol='ascii', grip_time=None,
+                 tolerances=None, ik_grid=None, workspace_resolution=None,
+                 ik_policy='legacy', ik_hysteresis=0.1, forbidden_branches=(),
+                 calibration=None, visualizer='matplotlib', timing_accels=None,
+                 timing_jerks=None, feedback_timeout=None, settle_time=None):
         """
         ロボットアームの初期化
         
         Args:
             port_xy: XY関節のシリアルポート
             port_z: Z軸・グリッパのシリアルポート
+            motion_feedback: True=ファームウェアの完了通知で待機を打ち切る
+            concurrent_axes: True=set_poseで複数軸を同時に動かす
+            timing_profile: 移動時間予測の速度プロファイル ('trapezoid' / 'scurve')
+            wait_margin: 完了通知なしのとき予測移動時間に加える待機マージン(秒)
+            distance_rate: 距離センサのバックグラウンド取得周期(Hz)。None=都度取得
+            protocol: 'ascii'=従来の文字列コマンド、'binary'=CRC付きバイナリフレーム
+            grip_time: グリッパ開閉の待機時間(秒)。None=GRIP_ACTUATION_TIME
+            tolerances: 重複コマンド抑制の許容誤差 {'angle', 'z', 'speed'}
+            ik_grid: 逆運動学グリッドの .npy パス（無ければ作成）。None=グリッドを使わない
+            workspace_resolution: 作業領域マップのセルの一辺。None=マップを使わない
+            ik_policy: 逆運動学の解の選び方 ('legacy'=yの符号 / 'travel'=予測移動時間最短)
+            ik_hysteresis: 肘の向きを変えるのに必要な短縮時間(秒)
+            forbidden_branches: 使わない肘の向き ('a': t2>=0 / 'b': t2<=0)
+            calibration: プリセット位置の校正ファイル（JSON）。None=クラス定数を使う
+            visualizer: 描画プラグイン ('matplotlib' / None=ヘッドレス / プラグインのオブジェクト)
+            timing_accels: 移動時間予測の軸ごとの加速度 {'X', 'Y', 'Z'}（実測値）。
+                           省略時は仮の既定値を使い、完了通知なしの待機は従来の固定待機を下限とする
+            timing_jerks: 移動時間予測の軸ごとの加加速度 {'X', 'Y', 'Z'}（'scurve' のみ）
+            feedback_timeout: 完了通知を待つ上限(秒)。None=予測移動時間から決める
+            settle_time: 完了通知なしのとき移動後グリッパ動作前に待つ時間(秒)。None=SETTLE_TIME
         """
         # ---- 状態管理 ----
         self.prev_t1 = None
         self.prev_t2 = None
         self.is_gripping = False
+        self.grip_state = None  # None=不明, 'open', 'closed'
+        self.grip_time = self.GRIP_ACTUATION_TIME if grip_time is None else grip_time
+        self.settle_time = self.SETTLE_TIME if settle_time is None else settle_time
         self.sent_prev_x = None
         self.sent_prev_y = None
         self.sent_prev_z = None
         self.sent_prev_t1 = None
         self.sent_prev_t2 = None
+        self.command_cache = CommandCache(tolerances)
+        
+        # ---- プリセット位置（initialize で表を作成） ----
+        if calibration:
+            self.POSITIONS, self.POSITIONS_GRAB = load_calibration(
+                calibration, self.POSITIONS, self.POSITIONS_GRAB)
+        self.pose_table = None
+        
+        # ---- 逆運動学キャッシュ ----
+        grid = IKGrid.load_or_build(ik_grid, self.L1, self.L2) if ik_grid else None
+        self.ik_cache = IKCache(self._solve_ik, grid=grid)
+        self.ik_selector = BranchSelector(self, ik_policy, ik_hysteresis, forbidden_branches)
+        
+        # ---- 作業領域マップ（initialize で作成） ----
+        self.workspace_resolution = workspace_resolution
+        self.workspace_map = None
         
         # ---- スレッド制御 ----
-        self.motion_stop_event = threading.Event()
+        # 待機はすべて _motion_cond で行い、motion_stop_event.set() でも起きる
+        self._motion_cond = threading.Condition()
+        self.motion_stop_event = _StopEvent(self._motion_cond)
+        self.motion_queue = None
+        
+        # ---- 動作完了フィードバック ----
+        self.motion_feedback = motion_feedback
+        self.motion_done = {axis: threading.Event() for axis in self.MOTION_AXES}
+        self.concurrent_axes = concurrent_axes
+        
+        # ---- 移動時間予測 ----
+        self.timing = JointTimingModel(profile=timing_profile, accels=timing_accels,
+                                       jerks=timing_jerks)
+        self.wait_margin = wait_margin
+        self.baseline_waits = timing_accels is None
+        self.feedback_timeout = feedback_timeout
+        self.last_predicted_durations = {}
         
         # ---- Serial接続 ----
+        if protocol not in ('ascii', 'binary'):
+            raise ValueError(f"unknown protocol: {protocol}")
+        self.protocol = protocol
+        self.encoders = {'xy': FrameEncoder(), 'z': FrameEncoder()}
+        self._write_lock = threading.Lock()
+        self._batch_local = threading.local()
         self.ser_xy = None
         self.ser_z = None
+        self.readers = {}
         self._init_serial(port_xy, port_z)
+        self._init_readers()
+        
+        # ---- 距離センサ ----
+        self.distance_sampler = None
+        if distance_rate:
+            self.start_distance_sampler(distance_rate)
         
         # ---- 描画 ----
-        self.fig = None
-        self.ax = None
-        self.arm_line = None
-        self.target_dot = None
-        self.z_arrow = None
         self.t1_initial = None
         self.t2_initial = None
-        self._init_plot()
+        self.visualizer = create_visualizer(visualizer, self)
+        
+        # ---- 状態通知 ----
+        # 指令した関節角度(rad)・Z・グリッパの状態。変化するたびにリスナーへ渡す
+        self.arm_state = {'t1': None, 't2': None, 'z': None, 'grip': None,
+                          'l1': self.L1, 'l2': self.L2, 'time': None}
+        self.state_listeners = []
     
     def _init_serial(self, port_xy, port_z):
         """Serial接続の初期化"""
         try:
             self.ser_xy = serial.Serial(port_xy, 115200, timeout=1)
-            time.sleep(2)
+            self._wait(2)
             print(f"XY関節接続: {port_xy}")
         except Exception as e:
             print(f"XY関節接続失敗: {e}")
@@ -82,52 +221,38 @@ class RobotArm:
         
         try:
             self.ser_z = serial.Serial(port_z, 115200, timeout=1)
-            time.sleep(2)
+            self._wait(2)
             print(f"Z軸・グリッパ接続: {port_z}")
         except Exception as e:
             print(f"Z軸・グリッパ接続失敗: {e}")
             self.ser_z = None
     
-    def _init_plot(self):
-        """matplotlib描画の初期化"""
-        plt.ion()
-        self.fig, self.ax = plt.subplots()
-        self.status_text = self.ax.text(
-            0.02, 0.98, f"G:{self.is_gripping}",
-            transform=self.ax.transAxes,
-            ha='left', va='top', fontsize=14
-        )
-
-        self.ax.set_aspect('equal')
-        self.ax.set_xlim(-1.2, 1.2)
-        self.ax.set_ylim(-1.2, 1.2)
-        self.arm_line, = self.ax.plot([], [], 'o-', lw=2)
-        self.target_dot, = self.ax.plot([], [], 'rx')
-        self.z_arrow = self.ax.arrow(0, 0, 0, 0, head_width=0.05, color="blue")
-        
+    def _init_readers(self):
+        """ポートごとの受信スレッドを開始"""
+        for name, ser in (('xy', self.ser_xy), ('z', self.ser_z)):
+            if ser is None:
+                continue
+            decoder = FrameDecoder() if self.protocol == 'binary' else None
+            reader = SerialLineReader(ser, name=name, decoder=decoder)
+            reader.subscribe("DONE", self._on_done)
+            reader.subscribe("ERR", lambda fields, name=name:
+                             print(f"ファームウェアエラー({name}): {','.join(fields[1:])}"))
+            reader.start()
+            self.readers[name] = reader
+    
     # ---- 描画 ----
     def draw_arm(self, t1, t2, x, y, theta_z):
-        p0, p1, p2 = self.fk(t1, t2)
-
-        self.arm_line.set_data([p0[1], p1[1], p2[1]],
-                            [p0[0], p1[0], p2[0]])
-        self.target_dot.set_data([y], [x])
-
-        self.z_arrow.remove()
-        dx = 0.3 * math.sin(theta_z)
-        dy = 0.3 * math.cos(theta_z)
-        self.z_arrow = self.ax.arrow(0, 0, dx, dy, head_width=0.05, color="blue")
-
-        self.status_text.set_text(f"G:{self.is_gripping}")
-
-
-        self.fig.canvas.draw_idle()
-        self.fig.canvas.flush_events()
-        plt.pause(0.001)
+        """描画プラグインへ姿勢を渡す（ヘッドレスなら何もしない）"""
+        if self.visualizer is not None:
+            self.visualizer.draw(t1, t2, x, y, theta_z, self.is_gripping)
     
     # ---- 逆運動学 ----
     def ik_both(self, x, y):
-        """両解を求める"""
+        """両解を求める（キャッシュ経由）"""
+        return self.ik_cache.solve(x, y)
+    
+    def _solve_ik(self, x, y):
+        """両解を厳密に求める"""
         r2 = x*x + y*y
         r = math.sqrt(r2)
         if r > self.L1 + self.L2 or r < abs(self.L1 - self.L2):
@@ -149,17 +274,35 @@ class RobotArm:
         return solve(t2a), solve(t2b)
     
     def ik(self, x, y):
-        """連続性を考慮した逆運動学"""
-        (a1, a2), (b1, b2) = self.ik_both(x, y)
+        """
+        連続性を考慮した逆運動学
+        
+        解の選び方は ik_policy に従う（ik_branch.BranchSelector）。
+        可動範囲内の解が無ければ ValueError
+        """
+        solutions = self.ik_both(x, y)
         if self.prev_t1 is None:
-            self.prev_t1, self.prev_t2 = a1, a2
-            return a1, a2
-        if y <= 0:
-            self.prev_t1, self.prev_t2 = a1, a2
-            return a1, a2
+            t1, t2 = solutions[0]
         else:
-            self.prev_t1, self.prev_t2 = b1, b2
-            return b1, b2
+            current = None
+            if self.sent_prev_t1 is not None:
+                current = (self.sent_prev_t1, self.sent_prev_t2)
+            t1, t2 = self.ik_selector.select(x, y, solutions, current)
+        self.prev_t1, self.prev_t2 = t1, t2
+        return t1, t2
+    
+    def ik_batch(self, points):
+        """
+        逆運動学の両解をNumPyで一括計算
+        
+        Args:
+            points: (N, 2) の目標座標
+        
+        Returns:
+            (sol_a, sol_b, reachable) 詳細は kinematics_batch.ik_batch
+        """
+        from kinematics_batch import ik_batch
+        return ik_batch(points, self.L1, self.L2)
     
     # ---- 順運動学 ----
     def fk(self, t1, t2):
@@ -170,84 +313,475 @@ class RobotArm:
         y2 = y1 + self.L2 * math.sin(t1 + t2)
         return (0, 0), (x1, y1), (x2, y2)
     
+    def fk_batch(self, joints):
+        """
+        順運動学をNumPyで一括計算
+        
+        Args:
+            joints: (N, 2) の関節角度
+        
+        Returns:
+            (N, 3, 2) のリンク位置 [根元, 肘, 手先]
+        """
+        from kinematics_batch import fk_batch
+        return fk_batch(joints, self.L1, self.L2)
+    
+    # ---- 状態通知 ----
+    def add_state_listener(self, callback):
+        """
+        指令状態の変化を受け取るコールバックを登録
+        
+        Args:
+            callback: callback(state)。state は arm_state のコピー。
+                      モーションのスレッドから呼ばれるので、すぐに戻ること
+        """
+        self.state_listeners.append(callback)
+    
+    def remove_state_listener(self, callback):
+        if callback in self.state_listeners:
+            self.state_listeners.remove(callback)
+    
+    def _publish_state(self, **changes):
+        """指令状態を更新してリスナーへ通知"""
+        self.arm_state.update(changes)
+        self.arm_state['time'] = time.time()
+        if self.state_listeners:
+            state = dict(self.arm_state)
+            for callback in list(self.state_listeners):
+                callback(state)
+    
     # ---- Serial通信 ----
+    def _port(self, port):
+        """'xy' / 'z' に対応するシリアル"""
+        return self.ser_xy if port == 'xy' else self.ser_z
+    
+    def _encode(self, port, name, *values):
+        """現在のプロトコルでコマンドをバイト列にする"""
+        if self.protocol == 'binary':
+            return self.encoders[port].encode(name, *values)
+        return encode_ascii(name, *values)
+    
+    def _command(self, port, name, *values):
+        """
+        コマンドを送信
+        
+        Args:
+            port: 'xy' または 'z'
+            name: コマンド名 (serial_protocol.COMMANDS のキー)
+            *values: コマンドの引数
+        """
+        self._send(port, name, values)
+    
+    def _write(self, port, data):
+        """エンコード済みのバイト列を送信（batch() の中ではバッファする）"""
+        self._send(port, None, data)
+    
+    def _send(self, port, name, payload):
+        """
+        送信の共通処理
+        
+        バイナリの通し番号は送信順と一致している必要があるので、エンコードは
+        書き込みと同じロックの中で行う（batch() では送信時にまとめてエンコード）。
+        
+        Args:
+            name: コマンド名。None=payload がエンコード済みのバイト列
+            payload: コマンドの引数、またはバイト列
+        """
+        ser = self._port(port)
+        if not ser:
+            return
+        buffers = getattr(self._batch_local, 'buffers', None)
+        if buffers is not None:
+            buffers.setdefault(port, []).append((name, payload))
+            return
+        with self._write_lock:
+            ser.write(payload if name is None else self._encode(port, name, *payload))
+    
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        ブロック内のコマンドをポートごとにまとめて送信する
+        
+        with arm.batch(): の中で呼んだ set_t1 / set_t2 / send_z / グリップ /
+        速度設定はバッファされ、ブロックを抜けた時に各ポート1回の write で送られる。
+        例外で抜けた場合は何も送信しない。入れ子にした場合は最も外側でまとめて送る。
+        バッファは呼び出したスレッドごとに独立している。
+        """
+        if getattr(self._batch_local, 'buffers', None) is not None:
+            yield
+            return
+        self._batch_local.buffers = {}
+        try:
+            yield
+        except BaseException:
+            self._batch_local.buffers = None
+            raise
+        buffers, self._batch_local.buffers = self._batch_local.buffers, None
+        with self._write_lock:
+            for port, items in buffers.items():
+                data = b"".join(payload if name is None else self._encode(port, name, *payload)
+                                for name, payload in items)
+                self._port(port).write(data)
+    
     def set_t1(self, v):
         """第1関節をセット"""
-        if self.ser_xy:
-            self.ser_xy.write(f"X,{v:.3f}\n".encode())
+        self._command('xy', 'X', v)
     
     def set_t2(self, v):
         """第2関節をセット"""
-        if self.ser_xy:
-            self.ser_xy.write(f"Y,{v:.3f}\n".encode())
+        self._command('xy', 'Y', v)
+    
+    def set_t1_t2(self, v1, v2):
+        """第1・第2関節を1回の送信でセット"""
+        self._command('xy', 'XY', v1, v2)
     
     def send_z(self, z):
         """Z軸をセット"""
-        if self.ser_z:
-            self.ser_z.write(f"Z,{z:.3f},0\n".encode())
+        self._command('z', 'Z', z, 0)
+    
+    def _set_speed(self, port, name, axis, speed):
+        """速度設定（前回と同じ値なら送信しない）"""
+        self.timing.set_speed(axis, speed)
+        if self.pose_table is not None:
+            self.pose_table.invalidate_travel()
+        if self.command_cache.should_send(name, speed, 'speed'):
+            self._command(port, name, speed)
+            self.command_cache.update(name, speed)
     
     def set_t1_speed(self, speed):
-        if self.ser_xy:
-            self.ser_xy.write(f"S1,{speed}\n".encode())
+        self._set_speed('xy', 'S1', 'X', speed)
             
     def set_t2_speed(self, speed):
-        if self.ser_xy:
-            self.ser_xy.write(f"S2,{speed}\n".encode())
+        self._set_speed('xy', 'S2', 'Y', speed)
 
     def set_z_speed(self, speed):
-        if self.ser_z:
-            self.ser_z.write(f"Sz,{speed}\n".encode())
+        self._set_speed('z', 'Sz', 'Z', speed)
             
     
     def close_grip(self):
         """グリップを閉じる"""
-        if self.ser_z:
-            self.ser_z.write(b"G\n")
+        self._command('z', 'G')
+        self.grip_state = 'closed'
+        self.is_gripping = True
+        self._publish_state(grip='closed')
     
     def open_grip(self):
         """グリップを開く"""
-        if self.ser_z:
-            self.ser_z.write(b"R\n")
+        self._command('z', 'R')
+        self.grip_state = 'open'
+        self.is_gripping = False
+        self._publish_state(grip='open')
+    
+    def set_grip(self, should_grip, wait=None):
+        """
+        グリッパを指定状態にして動作完了を待つ
+        既にその状態ならコマンドも待機も省略する
+        
+        Args:
+            should_grip: True=閉じる、False=開く
+            wait: 最大待機時間(秒)。None=grip_time
+        
+        Returns:
+            True=コマンドを送信した
+        """
+        if self.grip_state == ('closed' if should_grip else 'open'):
+            return False
+        self._check_stopped()
+        
+        self._begin_motion('G')
+        if should_grip:
+            self.close_grip()
+        else:
+            self.open_grip()
+        self.wait_motion('G', self._motion_timeout(self.grip_time, margin=False)
+                         if wait is None else wait)
+        return True
+    
+    def _settle(self):
+        """完了通知が無い場合、移動後の振動が収まるまで待つ"""
+        if not self.motion_feedback:
+            self._wait(self.settle_time)
+    
+    def request_distance(self):
+        """距離センサ値を要求（応答は UR として受信スレッドに届く）"""
+        self._command('z', 'U')
+    
+    def start_distance_sampler(self, rate_hz=10.0):
+        """距離センサのバックグラウンド取得を開始"""
+        if not self.ser_z:
+            return
+        if self.distance_sampler is None:
+            self.distance_sampler = DistanceSampler(self, rate_hz=rate_hz)
+        self.distance_sampler.start()
     
-    def get_distance(self, timeout=0.2):
-        """距離センサ値を取得"""
+    def stop_distance_sampler(self):
+        """距離センサのバックグラウンド取得を停止"""
+        if self.distance_sampler is not None:
+            self.distance_sampler.stop()
+    
+    def get_distance(self, timeout=0.2, max_age=None):
+        """
+        距離センサ値を取得
+        
+        Args:
+            timeout: 都度取得時の最大待機時間(秒)
+            max_age: バックグラウンド取得時に許容する値の古さ(秒)。None=DISTANCE_MAX_AGE
+        """
         if not self.ser_z:
             return -1
         
-        self.ser_z.reset_input_buffer()
-        self.ser_z.write(b"U\n")
-        
-        latest_ur = None
-        t0 = time.time()
-        
-        while time.time() - t0 < timeout:
-            if self.ser_z.in_waiting:
-                line = self.ser_z.readline().decode('utf-8', errors='ignore').strip()
-                print(line)
-                
-                parts = line.split(",")
-                if len(parts) >= 2 and parts[0] == "UR":
-                    try:
-                        latest_ur = float(parts[1])
-                    except ValueError:
-                        pass
-        
-        return latest_ur
+        if self.distance_sampler is not None and self.distance_sampler.running:
+            if max_age is None:
+                max_age = self.DISTANCE_MAX_AGE
+            return self.distance_sampler.latest(max_age)
+        
+        # 受信スレッド経由で UR 応答を1つ待つ（停止要求で MotionCancelled）
+        reader = self.readers['z']
+        replies = []
+        
+        def on_reply(fields):
+            try:
+                value = float(fields[1])
+            except (IndexError, ValueError):
+                return
+            with self._motion_cond:
+                replies.append(value)
+                self._motion_cond.notify_all()
+        
+        callback = reader.subscribe("UR", on_reply)
+        try:
+            self.request_distance()
+            if not self._wait(timeout, lambda: bool(replies)):
+                return None
+            return replies[0]
+        finally:
+            reader.unsubscribe("UR", callback)
+
+    # ---- 動作完了待ち ----
+    def _axis_port(self, axis):
+        """軸に対応するシリアルポート"""
+        return self.ser_z if axis in ('Z', 'G') else self.ser_xy
+    
+    def _on_done(self, fields):
+        """完了通知 "DONE,<軸>" の受信"""
+        if len(fields) >= 2 and fields[1] in self.motion_done:
+            with self._motion_cond:
+                self.motion_done[fields[1]].set()
+                self._motion_cond.notify_all()
+    
+    def _begin_motion(self, axes):
+        """指令送信前に完了フラグをリセット"""
+        with self._motion_cond:
+            for axis in axes:
+                self.motion_done[axis].clear()
+    
+    def wait_motion(self, axes, timeout):
+        """
+        指定軸の動作完了を待つ
+        
+        Args:
+            axes: 待機する軸 (e.g., 'XY', ('Z',))
+            timeout: 最大待機時間(秒)。フィードバック無効時は固定待機
+        
+        Returns:
+            True=全軸の完了を確認、False=タイムアウト
+        """
+        if getattr(self._batch_local, 'buffers', None) is not None:
+            raise RuntimeError("batch() の中では動作完了を待てません")
+        
+        if not self.motion_feedback:
+            self._wait(timeout)
+            return False
+        
+        # 未接続の軸は通知が来ないので待たない
+        axes = [a for a in axes if self._axis_port(a)]
+        done = self._wait(timeout, lambda: all(self.motion_done[a].is_set() for a in axes))
+        if not done:
+            print(f"動作完了通知タイムアウト: {''.join(axes)}")
+        return done
+    
+    def _motion_timeout(self, predicted, margin=True, baseline=0.0):
+        """
+        予測時間に対する待機時間
+        
+        完了通知なし: 予測時間+マージンだけ待つ（この時間で動作が終わる前提）。
+                      加速度が実測値でない間は baseline を下回らない
+        完了通知あり: 通知で待機を打ち切るので、これは安全のための上限。
+                      予測が外れても次の指令を早く送らないよう大きくとる
+        
+        Args:
+            predicted: 予測時間(秒)
+            margin: 完了通知なしのとき wait_margin を加えるか
+            baseline: 完了通知なしのときの従来の固定待機(秒)
+        """
+        if not self.motion_feedback:
+            wait = predicted + (self.wait_margin if margin else 0.0)
+            return max(wait, baseline) if self.baseline_waits else wait
+        if self.feedback_timeout is not None:
+            return self.feedback_timeout
+        return predicted * self.FEEDBACK_TIMEOUT_FACTOR + self.FEEDBACK_TIMEOUT_MIN
+    
+    # ---- 待機・停止 ----
+    def _wait(self, timeout, until=None):
+        """
+        RobotArm の待機はすべてこれを通す
+        
+        期限・条件の成立（動作完了通知など _motion_cond で通知されるもの）・停止要求の
+        いずれかで起きる。ポーリングはしない。
+        
+        Args:
+            timeout: 最大待機時間(秒)。None=無期限
+            until: 条件関数。None=期限まで待つ
+        
+        Returns:
+            True=条件が成立、False=期限切れ
+        
+        Raises:
+            MotionCancelled: 停止要求があった
+        """
+        with self._motion_cond:
+            done = self._motion_cond.wait_for(
+                lambda: self.motion_stop_event.is_set() or (until is not None and until()),
+                timeout)
+            stopped = self.motion_stop_event.is_set()
+        if stopped:
+            raise MotionCancelled("motion stopped")
+        return bool(done)
+    
+    def _check_stopped(self):
+        """停止中なら新しい指令を送らない"""
+        if self.motion_stop_event.is_set():
+            raise MotionCancelled("motion stopped")
+    
+    def stop(self, cancel_pending=True):
+        """
+        動作を止める
+        
+        待機中の動作は直ちに MotionCancelled で中断し、resume() までは新しい動作も
+        指令を送らずに MotionCancelled になる。
+        
+        Args:
+            cancel_pending: True=submit 済みで未着手の動作も取り消す
+        """
+        self.motion_stop_event.set()
+        if cancel_pending and self.motion_queue is not None:
+            self.motion_queue.cancel_pending()
+    
+    def resume(self):
+        """stop() を解除する"""
+        self.motion_stop_event.clear()
 
     # ---- ユーティリティ ----
     def non_blocking_sleep(self, duration):
-        """ウィンドウをフリーズさせない待機"""
-        end_time = time.time() + duration
-        while time.time() < end_time:
-            plt.gcf().canvas.draw_idle()
-            plt.gcf().canvas.flush_events()
-            plt.pause(0.01)
-            if self.motion_stop_event.is_set():
-                break
+        """
+        ウィンドウをフリーズさせない待機
+        
+        ヘッドレスでは _wait と同じ。描画プラグインがある場合はその spin に任せ、
+        停止要求があれば MotionCancelled
+        """
+        if self.visualizer is None:
+            self._wait(duration)
+            return
+        self.visualizer.spin(duration, self.motion_stop_event)
+        self._check_stopped()
     
     # ---- 制御メソッド ----
+    def predict_durations(self, t1, t2, z):
+        """
+        現在の指令姿勢から目標姿勢までの各軸の予測移動時間
+        
+        Args:
+            t1, t2: 目標関節角度（ラジアン）
+            z: 目標Z軸回転角度
+        
+        Returns:
+            {'X': 秒, 'Y': 秒, 'Z': 秒}
+        """
+        return self.timing.durations({
+            'X': (t1 - self.sent_prev_t1) * self.L1_SCALE,
+            'Y': (t2 - self.sent_prev_t2) * self.L2_SCALE,
+            'Z': (z - self.sent_prev_z) * self.LL_SCALE,
+        })
+    
+    def current_pose(self):
+        """現在の指令姿勢 (t1_deg, t2_deg)"""
+        return (math.degrees(self.sent_prev_t1), math.degrees(self.sent_prev_t2))
+    
+    def travel_time(self, from_pose, to_pose):
+        """
+        2姿勢間のXY移動の予測時間(秒)
+        
+        Args:
+            from_pose, to_pose: POSITIONS のキー、または (t1_deg, t2_deg) 
+        """
+        if self.pose_table is not None and isinstance(from_pose, str) and isinstance(to_pose, str):
+            result = self.pose_table.travel_time(from_pose, to_pose)
+            if result is not None:
+                return result
+        t1a, t2a = self.POSITIONS[from_pose][:2] if isinstance(from_pose, str) else from_pose[:2]
+        t1b, t2b = self.POSITIONS[to_pose][:2] if isinstance(to_pose, str) else to_pose[:2]
+        return self.joint_travel_time(math.radians(t1b - t1a), math.radians(t2b - t2a))
+    
+    def joint_travel_time(self, dt1, dt2):
+        """
+        関節角度の変化量に対するXY移動の予測時間(秒)
+        
+        Args:
+            dt1, dt2: 第1・第2関節の変化量（ラジアン）
+        """
+        d = self.timing.durations({
+            'X': dt1 * self.L1_SCALE,
+            'Y': dt2 * self.L2_SCALE,
+        })
+        return max(d.values()) if self.concurrent_axes else sum(d.values())
+    
+    def _send_axes(self, t1, t2, z, axes, compiled=None):
+        """
+        指定軸へ目標値を送信
+        
+        Args:
+            compiled: プリセット姿勢の事前計算値 (CompiledXY, CompiledZ)。
+                      エンコード済みのバイト列があればそのまま送る
+        """
+        xy, zc = compiled if compiled is not None else (None, None)
+        with self.batch():
+            if 'Z' in axes:
+                if zc is not None and zc.data is not None:
+                    self._write('z', zc.data)
+                else:
+                    self.send_z(z * self.LL_SCALE)
+            name = ('XY' if 'X' in axes and 'Y' in axes
+                    else 'X' if 'X' in axes else 'Y' if 'Y' in axes else None)
+            if name is not None and xy is not None and xy.data is not None:
+                self._write('xy', xy.data[name])
+            elif name is not None:
+                v1 = (t1 - self.t1_initial) * self.L1_SCALE
+                v2 = (t2 - self.t2_initial) * self.L2_SCALE
+                if name == 'XY':
+                    self.set_t1_t2(v1, v2)
+                elif name == 'X':
+                    self.set_t1(v1)
+                else:
+                    self.set_t2(v2)
+        changes = {}
+        for axis, key, value in (('X', 't1', t1), ('Y', 't2', t2), ('Z', 'z', z)):
+            if axis in axes:
+                self.command_cache.update(axis, value)
+                changes[key] = value
+        self._publish_state(**changes)
+    
+    def _baseline_waits(self, t1, t2):
+        """現在の指令姿勢から目標姿勢までの従来の固定待機 {'X', 'Y', 'Z'}(秒)"""
+        delta = max(abs(t1 - self.sent_prev_t1), abs(t2 - self.sent_prev_t2))
+        xy = self.BASELINE_WAIT_XY + self.BASELINE_WAIT_XY_SCALE * (delta / math.pi - 0.5)
+        return {'X': xy, 'Y': xy, 'Z': self.BASELINE_WAIT_Z}
+    
+    def _is_overlap_safe(self, z):
+        """Z移動をXY移動と同時に行っても干渉しないか"""
+        return max(abs(z), abs(self.sent_prev_z)) <= self.Z_OVERLAP_LIMIT
+    
     def set_pose(self, t1, t2, z, draw=True, send_xy=True, send_z_signal=True, 
-                 is_z_xy=True, wait_xy=2.5, wait_z=2.0):
+                 is_z_xy=True, wait_xy=None, wait_z=None, concurrent=None, compiled=None):
         """
         角度指定でアーム姿勢を設定
         
@@ -258,44 +792,66 @@ class RobotArm:
             send_xy: XY関節信号を送信するか
             send_z_signal: Z軸信号を送信するか
             is_z_xy: True=Z先行、False=XY先行
-            wait_xy: XY関節送信後の待機時間(秒)
-            wait_z: Z軸送信後の待機時間(秒)
+            wait_xy: XY関節送信後の待機時間(秒)。None=予測移動時間+マージン
+            wait_z: Z軸送信後の待機時間(秒)。None=予測移動時間+マージン
+            concurrent: True=t1/t2を同時送信し最も遅い軸だけ待つ。None=インスタンス設定に従う
+            compiled: プリセット姿勢の事前計算値 (CompiledXY, CompiledZ)
         """
-        _, (x1, y1), (x2, y2) = self.fk(t1, t2)
+        self._check_stopped()
+        if compiled is not None:
+            x2, y2 = compiled[0].tip
+        else:
+            _, (x1, y1), (x2, y2) = self.fk(t1, t2)
         
         if draw:
             self.draw_arm(t1, t2, x2, y2, z)
         
-        if is_z_xy:
-            # Z先行
-            if send_z_signal:
-                if self.sent_prev_z != z:
-                    self.send_z(z * self.LL_SCALE)
-                    time.sleep(wait_z)
-            if send_xy:
-                if self.sent_prev_t1 != t1:
-                    self.set_t1((t1 - self.t1_initial) * self.L1_SCALE)
-                    time.sleep(wait_xy)
-                if self.sent_prev_t2 != t2:
-                    self.set_t2((t2 - self.t2_initial) * self.L2_SCALE)
-                    time.sleep(wait_xy)
+        if concurrent is None:
+            concurrent = self.concurrent_axes
+        
+        # 前回の指令値と許容誤差内で同じ軸は送らない
+        cache = self.command_cache
+        xy_axes = ''
+        if send_xy:
+            if cache.should_send('X', t1, 'angle'):
+                xy_axes += 'X'
+            if cache.should_send('Y', t2, 'angle'):
+                xy_axes += 'Y'
+        move_z = send_z_signal and cache.should_send('Z', z, 'z')
+        
+        # 軸ごとの待機時間（指定がなければ予測移動時間から決める）
+        self.last_predicted_durations = self.predict_durations(t1, t2, z)
+        baseline = self._baseline_waits(t1, t2)
+        waits = {axis: self._motion_timeout(d, baseline=baseline[axis])
+                 for axis, d in self.last_predicted_durations.items()}
+        if wait_xy is not None:
+            waits['X'] = waits['Y'] = wait_xy
+        if wait_z is not None:
+            waits['Z'] = wait_z
+        
+        # 同時に動かす軸の段階リストを組み立てる
+        if not concurrent:
+            # 1軸ずつ順番に動かす
+            order = 'ZXY' if is_z_xy else 'XYZ'
+            phases = [axis for axis in order
+                      if axis in xy_axes or (axis == 'Z' and move_z)]
+        elif move_z and xy_axes and not self._is_overlap_safe(z):
+            # 干渉の恐れがあるのでZとXYは段階を分ける
+            phases = ['Z', xy_axes] if is_z_xy else [xy_axes, 'Z']
         else:
-            # XY先行
-            if send_xy:
-                if self.sent_prev_t1 != t1:
-                    self.set_t1((t1 - self.t1_initial) * self.L1_SCALE)
-                    time.sleep(wait_xy)
-                if self.sent_prev_t2 != t2:
-                    self.set_t2((t2 - self.t2_initial) * self.L2_SCALE)
-                    time.sleep(wait_xy)
-            if send_z_signal:
-                if self.sent_prev_z != z:
-                    self.send_z(z * self.LL_SCALE)
-                    time.sleep(wait_z)
+            # 全軸を同時に動かし、最も遅い軸を待つ
+            axes = xy_axes + ('Z' if move_z else '')
+            phases = [axes] if axes else []
+        
+        for axes in phases:
+            self._begin_motion(axes)
+            self._send_axes(t1, t2, z, axes, compiled)
+            self.wait_motion(axes, max(waits[a] for a in axes))
         
         self.sent_prev_t1, self.sent_prev_t2, self.sent_prev_z = t1, t2, z
     
-    def move_to(self, x, y, z, should_grip, draw=True, wait_xy=2.5, wait_z=2.0):
+    def move_to(self, x, y, z, should_grip, draw=True, wait_xy=None, wait_z=None,
+                path=None, arc_center=None, arc_ccw=True, stream_step=0.01, stream_rate=50.0):
         """
         座標指定でアームを移動・グリップ
         
@@ -304,34 +860,153 @@ class RobotArm:
             z: Z軸回転角度
             should_grip: True=グリップ、False=リリース
             draw: UIに描画するか
-            wait_xy: XY関節送信後の待機時間(秒)
-            wait_z: Z軸送信後の待機時間(秒)
+            wait_xy: XY関節送信後の待機時間(秒)。None=予測移動時間+マージン
+            wait_z: Z軸送信後の待機時間(秒)。None=予測移動時間+マージン
+            path: None=関節空間で直接移動、'line'=直線、'arc'=円弧に沿って逐次送信
+            arc_center: 円弧の中心 (x, y)（path='arc' のとき）
+            arc_ccw: True=反時計回り、False=時計回り（path='arc' のとき）
+            stream_step: 経路のサンプル間隔
+            stream_rate: 経路の送信周期(Hz)。手先の速さ ≒ stream_step × stream_rate
         """
+        ok, reason = self.check_target(x, y)
+        if not ok:
+            print(f"移動できない座標: ({x}, {y}) {reason}")
+            return
+        
+        if path is not None:
+            # 手先座標は stream_to が実際の最終サンプルから記録する
+            if not self.stream_to(x, y, z, path, arc_center, stream_step, stream_rate,
+                                  draw=draw, wait_xy=wait_xy, wait_z=wait_z, ccw=arc_ccw):
+                return
+            self._settle()
+            self.set_grip(should_grip)
+            return
+        
         try:
             t1, t2 = self.ik(x, y)
         except ValueError:
             print(f"到達不可能な座標: ({x}, {y})")
             return
-
-        wait_xy = wait_xy+2.0*(max(abs(t1 - self.sent_prev_t1), abs(t2 - self.sent_prev_t2))/math.pi-0.5)
-        self.get_distance()
         
         is_z_xy = (self.sent_prev_z == 0)
         
         self.set_pose(t1, t2, z, draw=draw, send_xy=True, send_z_signal=True,
                      is_z_xy=is_z_xy, wait_xy=wait_xy, wait_z=wait_z)
         
-        if should_grip:
-            self.close_grip()
-            self.is_gripping = True
-        else:
-            self.open_grip()
-            self.is_gripping = False
+        self._settle()
+        self.set_grip(should_grip)
         
         self.sent_prev_x, self.sent_prev_y = x, y
-        time.sleep(1.0)
     
-    def move_to_angle(self, t1_deg, t2_deg, z, should_grip, draw=True, wait_xy=2.0, wait_z=2.0):
+    def stream_to(self, x, y, z, path='line', center=None, step=0.01, rate=50.0,
+                  draw=True, wait_xy=None, wait_z=None, ccw=True):
+        """
+        手先を直線・円弧に沿って動かす
+        
+        経路をサンプリングして一括で逆運動学を解き、XY関節の目標値を一定周期で
+        ser_xy へ逐次送信する。Z軸は経路の前後で通常どおり移動する。
+        
+        Args:
+            x, y: 目標座標
+            z: Z軸回転角度
+            path: 'line' または 'arc'
+            center: 円弧の中心 (x, y)
+            step: サンプル間隔
+            rate: 送信周期(Hz)
+            draw: UIに描画するか
+            wait_xy: 最後の目標値を送った後の待機時間(秒)。None=予測移動時間+マージン
+            wait_z: Z軸送信後の待機時間(秒)。None=予測移動時間+マージン
+            ccw: 円弧の向き（True=反時計回り）
+        
+        終了後の sent_prev_x / sent_prev_y は最後のサンプルの関節角度から求めた手先座標。
+        prev_t1 / prev_t2（解の選択の基準）も最後のサンプルの関節角度にする
+        
+        Returns:
+            True=完了、False=経路が不正
+        
+        Raises:
+            MotionCancelled: 送信中に停止要求があった
+        """
+        from cartesian_path import line_points, arc_points, joint_path, paced
+        from ik_branch import within_motor_limits
+        
+        start = (self.sent_prev_x, self.sent_prev_y)
+        if path == 'line':
+            points = line_points(start, (x, y), step)
+        elif path == 'arc':
+            if center is None:
+                raise ValueError("arc path needs a center")
+            points = arc_points(start, (x, y), center, step, ccw)
+        else:
+            raise ValueError(f"unknown path: {path}")
+        
+        joints, reachable = joint_path(points, self.L1, self.L2,
+                                       (self.sent_prev_t1, self.sent_prev_t2))
+        if self.workspace_map is not None:
+            reachable &= self.check_targets(points)
+        if not reachable.all():
+            bx, by = points[~reachable][0]
+            print(f"経路上に移動できない点があります: ({bx:.3f}, {by:.3f})")
+            return False
+        # 経路は現在の第1関節の周回に合わせてあるので、2π ずらすと最初の目標値が
+        # 1周分跳ぶ。ずらさずに可動範囲を外れる経路は送らない
+        within = within_motor_limits(self, joints[:, 0], joints[:, 1])
+        if not within.all():
+            bx, by = points[~within][0]
+            print(f"経路上に関節の可動範囲外の点があります: ({bx:.3f}, {by:.3f})")
+            return False
+        
+        t1, t2 = (float(v) for v in joints[-1])
+        is_z_xy = (self.sent_prev_z == 0)
+        if is_z_xy:
+            self.set_pose(self.sent_prev_t1, self.sent_prev_t2, z, draw=False,
+                          send_xy=False, wait_z=wait_z)
+        
+        # 最後の1区間だけはファームウェアが追従し終えるのを待つ
+        prev = joints[-2] if len(joints) > 1 else (self.sent_prev_t1, self.sent_prev_t2)
+        last = self.timing.durations({
+            'X': (t1 - prev[0]) * self.L1_SCALE,
+            'Y': (t2 - prev[1]) * self.L2_SCALE,
+        })
+        
+        v1 = (joints[:, 0] - self.t1_initial) * self.L1_SCALE
+        v2 = (joints[:, 1] - self.t2_initial) * self.L2_SCALE
+        sent = 0
+        for i, (m1, m2) in enumerate(paced(zip(v1, v2), rate, self.motion_stop_event)):
+            if i == len(joints) - 1:
+                self._begin_motion('XY')
+            self.set_t1_t2(float(m1), float(m2))
+            self._publish_state(t1=float(joints[i, 0]), t2=float(joints[i, 1]))
+            sent += 1
+        if sent < len(joints):
+            # 中断: 最後に送った目標値を指令姿勢とする
+            if sent:
+                self.sent_prev_t1, self.sent_prev_t2 = (float(v) for v in joints[sent - 1])
+                self.prev_t1, self.prev_t2 = self.sent_prev_t1, self.sent_prev_t2
+                _, _, (self.sent_prev_x, self.sent_prev_y) = self.fk(self.sent_prev_t1,
+                                                                     self.sent_prev_t2)
+                self.command_cache.invalidate('X')
+                self.command_cache.invalidate('Y')
+            raise MotionCancelled("motion stopped")
+        
+        self.command_cache.update('X', t1)
+        self.command_cache.update('Y', t2)
+        self.sent_prev_t1, self.sent_prev_t2 = t1, t2
+        # ik() を経由しないので、次の解の選択の基準になる姿勢をここで更新する
+        self.prev_t1, self.prev_t2 = t1, t2
+        _, _, (tip_x, tip_y) = self.fk(t1, t2)
+        self.sent_prev_x, self.sent_prev_y = tip_x, tip_y
+        self.wait_motion('XY', wait_xy if wait_xy is not None
+                         else self._motion_timeout(max(last.values()),
+                                                   baseline=self._baseline_waits(*prev)['X']))
+        
+        if draw:
+            self.draw_arm(t1, t2, tip_x, tip_y, z)
+        if not is_z_xy:
+            self.set_pose(t1, t2, z, draw=False, send_xy=False, wait_z=wait_z)
+        return True
+    
+    def move_to_angle(self, t1_deg, t2_deg, z, should_grip, draw=True, wait_xy=None, wait_z=None):
         """
         角度指定でアームを移動・グリップ
         
@@ -340,31 +1015,73 @@ class RobotArm:
             z: Z軸回転角度
             should_grip: True=グリップ、False=リリース
             draw: UIに描画するか
-            wait_xy: XY関節送信後の待機時間(秒)
-            wait_z: Z軸送信後の待機時間(秒)
+            wait_xy: XY関節送信後の待機時間(秒)。None=予測移動時間+マージン
+            wait_z: Z軸送信後の待機時間(秒)。None=予測移動時間+マージン
         """
-        t1 = math.radians(t1_deg)
-        t2 = math.radians(t2_deg)
-
-        wait_xy = wait_xy+2.0*(max(abs(t1 - self.sent_prev_t1), abs(t2 - self.sent_prev_t2))/math.pi-0.5)
+        compiled = None
+        if self.pose_table is not None:
+            xy = self.pose_table.xy.get((t1_deg, t2_deg))
+            zc = self.pose_table.z.get(z)
+            if xy is not None and zc is not None:
+                compiled = (xy, zc)
         
-        self.get_distance()
+        if compiled is not None:
+            t1, t2 = compiled[0].t1, compiled[0].t2
+        else:
+            t1, t2 = self.ik_cache.preset_radians(t1_deg, t2_deg)
         
         is_z_xy = (self.sent_prev_z == 0)
         
         self.set_pose(t1, t2, z, draw=draw, send_xy=True, send_z_signal=True,
-                     is_z_xy=is_z_xy, wait_xy=wait_xy, wait_z=wait_z)
+                     is_z_xy=is_z_xy, wait_xy=wait_xy, wait_z=wait_z, compiled=compiled)
         
-        if should_grip:
-            self.close_grip()
-            self.is_gripping = True
-        else:
-            self.open_grip()
-            self.is_gripping = False
+        self._settle()
+        self.set_grip(should_grip)
         
-        _, (x1, y1), (x2, y2) = self.fk(t1, t2)
+        if compiled is not None:
+            x2, y2 = compiled[0].tip
+        else:
+            _, (x1, y1), (x2, y2) = self.fk(t1, t2)
         self.sent_prev_x, self.sent_prev_y = x2, y2
-        time.sleep(1.0)
+    
+    # ---- 作業領域 ----
+    def build_workspace_map(self, resolution=0.01, forbidden=None):
+        """
+        作業領域マップを作成する（initialize 後）
+        
+        Args:
+            resolution: セルの一辺
+            forbidden: 禁止領域のリスト（None=FORBIDDEN_ZONES）
+        """
+        from workspace_map import WorkspaceMap
+        self.workspace_map = WorkspaceMap.build(self, resolution, forbidden)
+        return self.workspace_map
+    
+    def check_target(self, x, y):
+        """
+        目標座標をシリアル送信前に判定する
+        
+        Returns:
+            (True/False, 理由の文字列)。マップが無ければ常に True
+        """
+        if self.workspace_map is None:
+            return True, ""
+        return self.workspace_map.validate(x, y)
+    
+    def check_targets(self, points):
+        """
+        複数の目標座標を一括で判定する
+        
+        Args:
+            points: (N, 2) の座標
+        
+        Returns:
+            (N,) の bool 配列
+        """
+        from workspace_map import REACHABLE
+        if self.workspace_map is None:
+            self.build_workspace_map()
+        return self.workspace_map.classify_many(points) == REACHABLE
     
     # ---- 初期化 ----
     def initialize(self, x0=0.5, y0=-0.5, z0=0.0):
@@ -373,11 +1090,26 @@ class RobotArm:
         self.sent_prev_t1, self.sent_prev_t2 = self.t1_initial, self.t2_initial
         self.sent_prev_z = z0
         self.sent_prev_x, self.sent_prev_y = x0, y0
+        self.command_cache.update('X', self.t1_initial)
+        self.command_cache.update('Y', self.t2_initial)
+        self.command_cache.update('Z', z0)
+        self.pose_table = PoseTable(self)
+        self._publish_state(t1=self.t1_initial, t2=self.t2_initial, z=z0)
+        if self.workspace_resolution:
+            self.build_workspace_map(self.workspace_resolution)
         
         self.draw_arm(self.t1_initial, self.t2_initial, x0, y0, z0)
-        time.sleep(1.0)
+        self._wait(1.0)
     
     # ---- タスク実行 ----
+    def sequence(self):
+        """
+        動作シーケンスを作成する
+        
+        例: arm.sequence().grab('feeder').place('pos_1').run()
+        """
+        return MotionSequence(self)
+    
     def grab_at(self, pos_key):
         """
         指定位置からオブジェクトをつかむ
@@ -388,9 +1120,7 @@ class RobotArm:
         # pos_key = f'pos_{position_num}'
         
         # 上から下へ移動してつかむ
-        self.move_to_angle(*self.POSITIONS[pos_key], should_grip=False)
-        self.move_to_angle(*self.POSITIONS_GRAB[pos_key], should_grip=True)
-        self.move_to_angle(*self.POSITIONS[pos_key], should_grip=True)
+        self.sequence().grab(pos_key).run()
     
     def place_at(self, pos_key):
         """
@@ -402,18 +1132,50 @@ class RobotArm:
         # pos_key = f'pos_{position_num}'
         
         # 上から下へ移動して離す
-        self.move_to_angle(*self.POSITIONS[pos_key], should_grip=True)
-        self.move_to_angle(*self.POSITIONS_GRAB[pos_key], should_grip=False)
-        self.move_to_angle(*self.POSITIONS[pos_key], should_grip=False)
+        self.sequence().place(pos_key).run()
     
     
     
+    # ---- 非同期実行 ----
+    def submit(self, move, *args, callback=None, **kwargs):
+        """
+        動作を非同期に実行する
+        
+        投入した動作は専用スレッドで順番に実行される。キュー使用中は
+        他のスレッドから直接 move_to などを呼ばないこと。
+        
+        Args:
+            move: メソッド名 (e.g., 'grab_at') または呼び出し可能オブジェクト
+            *args, **kwargs: 動作に渡す引数
+            callback: 完了時に Future を引数に呼ばれる関数
+        
+        Returns:
+            concurrent.futures.Future
+        
+        Raises:
+            RuntimeError: close() の後に呼ばれた
+        """
+        if self.motion_queue is None:
+            self.motion_queue = MotionQueue(self)
+        return self.motion_queue.submit(move, *args, callback=callback, **kwargs)
+    
+    def wait_all(self, timeout=None):
+        """submit した動作がすべて終わるまで待つ"""
+        if self.motion_queue is None:
+            return True
+        return self.motion_queue.wait_all(timeout)
+    
     def close(self):
         """リソース解放"""
-        self.motion_stop_event.set()
+        self.stop()
+        if self.motion_queue is not None:
+            self.motion_queue.shutdown(cancel_pending=True)
+        self.stop_distance_sampler()
+        for reader in self.readers.values():
+            reader.stop()
         if self.ser_xy:
             self.ser_xy.close()
         if self.ser_z:
             self.ser_z.close()
-        plt.ioff()
-        plt.show()
+        if self.visualizer is not None:
+            self.visualizer.close()
@@ -8,7 +8,7 @@ import json
 import time
 import threading
 from collections import Counter
-from flask import Flask, jsonify, render_template
+from flask import Flask, Response, jsonify, render_template
 
 # ------------------------------
 # Path setup
@@ -18,6 +18,7 @@ ROOT_DIR = os.path.dirname(SCRIPT_DIR)
 sys.path.append(ROOT_DIR)
 
 from robot_arm_class import RobotArm
+from task_order import Job, order_jobs, preset_matrix
 
 HAND_FILE = os.path.join(
     ROOT_DIR,
@@ -28,6 +29,9 @@ HAND_FILE = os.path.join(
 
 DISCARD_POS = (0.5, 0.0, 0)
 
+# 配置中に次のカードのフィーダ確認を並行して進める
+PIPELINED_DEAL = True
+
 # ==============================
 # UI 状態管理
 # ==============================
@@ -54,6 +58,38 @@ class GameStatus:
 
 STATUS = GameStatus()
 
+
+class ArmBroadcaster:
+    """RobotArm の指令状態を /arm_stream の購読者へ配る"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.latest = None
+        self.version = 0
+
+    def publish(self, state):
+        """RobotArm の状態リスナー（最新の状態だけを保持する）"""
+        with self.cond:
+            self.latest = state
+            self.version += 1
+            self.cond.notify_all()
+
+    def wait(self, version, timeout):
+        """
+        version より新しい状態を待つ
+
+        Returns:
+            (state, version)。timeout までに更新が無ければ state は None
+        """
+        with self.cond:
+            self.cond.wait_for(
+                lambda: self.latest is not None and self.version != version, timeout)
+            if self.latest is None or self.version == version:
+                return None, version
+            return self.latest, self.version
+
+ARM_STREAM = ArmBroadcaster()
+
 # ==============================
 # Flask UI
 # ==============================
@@ -98,6 +134,21 @@ def start():
     threading.Thread(target=game_main, daemon=True).start()
     return jsonify({"ok": True})
 
+@app.route("/arm_stream")
+def arm_stream():
+    """アームの状態を Server-Sent Events で送る"""
+    def events():
+        version = -1
+        while True:
+            state, version = ARM_STREAM.wait(version, timeout=15)
+            if state is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"data: {json.dumps(state)}\n\n"
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache"})
+
 @app.route("/toggle_hand")
 def toggle_hand():
     STATUS.show_hand = not STATUS.show_hand
@@ -159,6 +210,12 @@ def place_card_at_position(robot, position_num):
     STATUS.log(f"{position_num}番に配置")
     robot.place_at(f'pos_{position_num}')
 
+def order_exchange_positions(robot, positions):
+    """交換する位置をアームの移動時間が短くなる順に並べ替える"""
+    here = robot.current_pose()
+    jobs = [Job(p, f'pos_{p}') for p in positions]
+    return [job.name for job in order_jobs(jobs, here, preset_matrix(robot, [here]))]
+
 def discard_card(robot):
     STATUS.log("カードを捨てる")
     robot.move_to(0.5, -0.5, 0, should_grip=True)
@@ -298,12 +355,15 @@ def decide_exchange_positions(hand, exchange_count):
 # ==============================
 
 def game_main():
-    robot = RobotArm(port_xy="COM5", port_z="COM10")
+    # Flask から起動するのでウィンドウは開かない
+    robot = RobotArm(port_xy="COM5", port_z="COM10", distance_rate=10, visualizer=None)
+    robot.add_state_listener(ARM_STREAM.publish)
     STATUS.log("ロボット準備開始")
     robot.initialize(x0=0.5, y0=-0.5, z0=0)
-    robot.set_t1_speed(4)
-    robot.set_t2_speed(4)
-    robot.set_z_speed(4)
+    with robot.batch():
+        robot.set_t1_speed(4)
+        robot.set_t2_speed(4)
+        robot.set_z_speed(4)
     
     if robot.ser_xy is None or robot.ser_z is None:
         STATUS.state = "ERROR"
@@ -319,18 +379,28 @@ def game_main():
         STATUS.state = "FETCH"
         STATUS.log("カード取得開始")
 
+        placing = None
         for i in range(1, 6):
+            # 前のカードを置いている間にフィーダの確認を進める
             wait_for_card_in_feeder(robot)
             card = STATUS.last_pick
             STATUS.log(f"読み取ったカード(debug): {card}")
 
+            # アームがフィーダに戻るのは配置が終わってから
+            if placing is not None:
+                placing.result()
             fetch_card_from_feeder(robot)
             
             hand.append(card)
-            place_card_at_position(robot, i)
+            if PIPELINED_DEAL:
+                placing = robot.submit(place_card_at_position, robot, i)
+            else:
+                place_card_at_position(robot, i)
+                time.sleep(0.5)
             STATUS.hand = [str(c) for c in hand]
-            
-            time.sleep(0.5)
+
+        if placing is not None:
+            placing.result()
 
         for exch in range(2):
             pos = decide_exchange_positions(hand, exch)
@@ -340,7 +410,7 @@ def game_main():
             STATUS.state = "EXCHANGE"
             STATUS.log(f"{len(pos)}枚交換")
 
-            for p in pos:
+            for p in order_exchange_positions(robot, pos):
                 robot.grab_at(f'pos_{p}')
                 discard_card(robot)
                 wait_for_card_in_feeder(robot)
@@ -0,0 +1,248 @@
+"""
+シリアル通信プロトコル（ASCII / バイナリフレーム）
+
+ASCII: 従来の "X,1.234\\n" 形式。
+バイナリ: 1フレームの構成は次のとおり（整数はすべてリトルエンディアン）
+
+    0xA5 0x5A | seq(u8) | opcode(u8) | len(u8) | payload(len) | crc16(u16)
+
+- seq: ポートごとの通し番号（0-255で循環）。ACK で送信フレームを特定する
+- payload: 固定長フィールドの並び
+    'f' = 固定小数点 int32（値 x 1000、ASCII の %.3f と同じ分解能）
+    'c' = 軸名1文字 (u8)
+    'B' = u8
+- crc16: CRC-16/CCITT-FALSE（seq から payload 末尾まで）
+
+'XY' コマンドで t1/t2 を1フレームにまとめて送れる。
+ファームウェア側も同じ表 (COMMANDS) で実装する。
+"""
+import struct
+
+SYNC = b"\xa5\x5a"
+HEADER_SIZE = 5   # sync(2) + seq + opcode + len
+CRC_SIZE = 2
+FIXED_SCALE = 1000
+
+# ---- コマンド表: 名前 -> (opcode, payload形式) ----
+COMMANDS = {
+    # PC -> ファームウェア
+    'X': (0x01, 'f'),
+    'Y': (0x02, 'f'),
+    'XY': (0x03, 'ff'),
+    'Z': (0x04, 'ff'),
+    'S1': (0x10, 'f'),
+    'S2': (0x11, 'f'),
+    'Sz': (0x12, 'f'),
+    'G': (0x20, ''),
+    'R': (0x21, ''),
+    'U': (0x30, ''),
+    # ファームウェア -> PC
+    'UR': (0x80, 'f'),
+    'DONE': (0x81, 'c'),
+    'ERR': (0x82, 'B'),
+    'ACK': (0x83, 'B'),
+}
+OPCODES = {op: (name, fmt) for name, (op, fmt) in COMMANDS.items()}
+
+# ---- ASCII 形式 ----
+ASCII_FORMATS = {
+    'X': "X,{:.3f}\n",
+    'Y': "Y,{:.3f}\n",
+    'XY': "X,{:.3f}\nY,{:.3f}\n",
+    'Z': "Z,{:.3f},{}\n",
+    'S1': "S1,{}\n",
+    'S2': "S2,{}\n",
+    'Sz': "Sz,{}\n",
+    'G': "G\n",
+    'R': "R\n",
+    'U': "U\n",
+}
+
+
+def encode_ascii(name, *values):
+    """ASCII コマンドを生成"""
+    return ASCII_FORMATS[name].format(*values).encode()
+
+
+def crc16(data, crc=0xFFFF):
+    """CRC-16/CCITT-FALSE"""
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+def _pack_payload(fmt, values):
+    if len(values) != len(fmt):
+        raise ValueError(f"expected {len(fmt)} values, got {len(values)}")
+    out = bytearray()
+    for kind, v in zip(fmt, values):
+        if kind == 'f':
+            out += struct.pack("<i", int(round(float(v) * FIXED_SCALE)))
+        elif kind == 'c':
+            out += str(v).encode()[:1]
+        else:
+            out += struct.pack("<B", int(v))
+    return bytes(out)
+
+
+def _unpack_payload(fmt, payload):
+    values = []
+    pos = 0
+    for kind in fmt:
+        if kind == 'f':
+            values.append(struct.unpack_from("<i", payload, pos)[0] / FIXED_SCALE)
+            pos += 4
+        elif kind == 'c':
+            values.append(chr(payload[pos]))
+            pos += 1
+        else:
+            values.append(payload[pos])
+            pos += 1
+    return values
+
+
+def _payload_size(fmt):
+    return sum(4 if kind == 'f' else 1 for kind in fmt)
+
+
+class Frame:
+    """デコード済みフレーム"""
+
+    def __init__(self, seq, name, values):
+        self.seq = seq
+        self.name = name
+        self.values = values
+
+    def fields(self):
+        """ASCII 行を split(",") したのと同じ形のリスト"""
+        return [self.name] + [str(v) for v in self.values]
+
+    def __repr__(self):
+        return f"Frame(seq={self.seq}, name={self.name!r}, values={self.values})"
+
+
+class FrameEncoder:
+    """バイナリフレームの生成（ポートごとに1つ）"""
+
+    def __init__(self):
+        self.seq = 0
+
+    def encode(self, name, *values):
+        """
+        コマンドをフレームに変換
+
+        Args:
+            name: コマンド名 (e.g., 'X', 'XY', 'G')
+            *values: payload の値
+
+        Returns:
+            フレームのバイト列
+        """
+        opcode, fmt = COMMANDS[name]
+        payload = _pack_payload(fmt, values)
+        body = struct.pack("<BBB", self.seq, opcode, len(payload)) + payload
+        self.seq = (self.seq + 1) & 0xFF
+        return SYNC + body + struct.pack("<H", crc16(body))
+
+
+class FrameDecoder:
+    """受信バイト列からフレームを取り出す"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        """
+        受信データを追加してフレームを取り出す
+
+        Args:
+            data: 受信バイト列（途中で切れていてもよい）
+
+        Returns:
+            取り出せた Frame のリスト
+        """
+        self.buffer += data
+        frames = []
+        while True:
+            start = self.buffer.find(SYNC)
+            if start < 0:
+                # 同期バイトの片割れだけ残す
+                del self.buffer[:max(0, len(self.buffer) - 1)]
+                return frames
+            if start:
+                del self.buffer[:start]
+            if len(self.buffer) < HEADER_SIZE:
+                return frames
+
+            seq, opcode, length = self.buffer[2], self.buffer[3], self.buffer[4]
+            entry = OPCODES.get(opcode)
+            if entry is None or _payload_size(entry[1]) != length:
+                # ヘッダが壊れている（長さが壊れたまま続きを待つと後続のフレームが滞る）
+                self.errors += 1
+                del self.buffer[:1]
+                continue
+            end = HEADER_SIZE + length + CRC_SIZE
+            if len(self.buffer) < end:
+                return frames
+
+            body = bytes(self.buffer[2:HEADER_SIZE + length])
+            (crc,) = struct.unpack_from("<H", self.buffer, HEADER_SIZE + length)
+            if crc != crc16(body):
+                # 壊れたフレーム: 同期バイトを1つ飛ばして探し直す
+                self.errors += 1
+                del self.buffer[:1]
+                continue
+
+            name, fmt = entry
+            frames.append(Frame(seq, name, _unpack_payload(fmt, body[3:])))
+            del self.buffer[:end]
+
+
+# ---- 自己診断 ----
+def _self_test():
+    """CRC の既知値・エンコード→デコードの往復・破損フレームからの再同期を確認する"""
+    # CRC-16/CCITT-FALSE の標準チェック値
+    assert crc16(b"123456789") == 0x29B1
+    assert crc16(b"") == 0xFFFF
+
+    commands = [('X', 1.234), ('XY', -3.5, 12.0), ('Z', -9.135, 0), ('G',),
+                ('UR', 8.25), ('DONE', 'Y'), ('ERR', 7)]
+    encoder = FrameEncoder()
+    frames = [encoder.encode(name, *values) for name, *values in commands]
+
+    # 1バイトずつ与えても、まとめて与えても同じ結果になる
+    for chunks in ([b"".join(frames)], [bytes([b]) for b in b"".join(frames)]):
+        decoder = FrameDecoder()
+        decoded = [f for chunk in chunks for f in decoder.feed(chunk)]
+        assert [(f.seq, f.name, f.values) for f in decoded] == [
+            (seq, name, [v if isinstance(v, str) else float(v) for v in values])
+            for seq, (name, *values) in enumerate(commands)], decoded
+        assert decoder.errors == 0
+
+    # 通し番号は 255 の次に 0 へ戻る
+    encoder.seq = 255
+    assert [encoder.encode('G')[2] for _ in range(2)] == [255, 0]
+
+    # 破損したフレームだけを捨て、前後のノイズを読み飛ばして次のフレームに再同期する
+    for pos in range(2, len(frames[1])):
+        broken = bytearray(frames[1])
+        broken[pos] ^= 0x40
+        decoder = FrameDecoder()
+        decoded = decoder.feed(b"\x00\xa5" + frames[0] + bytes(broken) + b"\x5a" + frames[2])
+        assert [f.name for f in decoded] == ['X', 'Z'], (pos, decoded)
+        assert decoder.errors >= 1
+
+    # ASCII は従来の文字列と同じ
+    assert encode_ascii('XY', 1.25, -2) == b"X,1.250\nY,-2.000\n"
+    assert encode_ascii('Z', -9.135, 0) == b"Z,-9.135,0\n"
+
+
+if __name__ == "__main__":
+    _self_test()
+    print("serial_protocol: ok")
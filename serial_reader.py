@@ -0,0 +1,122 @@
+"""
+シリアル受信スレッドと行の振り分け
+
+ポートごとに1本のスレッドが受信行をすべて読み、先頭フィールド（"UR", "DONE",
+"ERR" など）ごとに登録されたコールバックへ振り分ける。
+受信データを捨てたり、in_waiting を空回りで監視したりする必要がなくなる。
+バイナリフレーム使用時は FrameDecoder で復号し、ASCII 行と同じ形で振り分ける。
+"""
+import threading
+
+
+class SerialLineReader:
+    """1ポート分の受信スレッド"""
+
+    # 受信待ちの最大ブロック時間(秒)。stop() の応答時間になる
+    READ_TIMEOUT = 0.1
+
+    def __init__(self, ser, name="", decoder=None):
+        """
+        Args:
+            ser: serial.Serial
+            name: ログ表示用の名前
+            decoder: serial_protocol.FrameDecoder（None=ASCII 行）
+        """
+        self.ser = ser
+        self.name = name
+        self.decoder = decoder
+        self._subscribers = {}  # 先頭フィールド -> [callback]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- 購読 ----
+    def subscribe(self, prefix, callback):
+        """
+        指定した先頭フィールドの行を購読する
+
+        Args:
+            prefix: 先頭フィールド (e.g., 'UR')。'*' は他に購読者がいない行すべて
+            callback: 行をカンマで分割したリストを引数に呼ばれる関数
+                      （受信スレッド上で呼ばれるので重い処理はしないこと）
+
+        Returns:
+            callback（unsubscribe 用）
+        """
+        with self._lock:
+            self._subscribers.setdefault(prefix, []).append(callback)
+        return callback
+
+    def unsubscribe(self, prefix, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(prefix, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def dispatch(self, line):
+        """1行を購読者へ振り分ける"""
+        self.dispatch_fields(line.split(","))
+
+    def dispatch_fields(self, fields):
+        """分割済みの1行を購読者へ振り分ける"""
+        line = ",".join(fields)
+        with self._lock:
+            callbacks = list(self._subscribers.get(fields[0], ()))
+            if not callbacks:
+                callbacks = list(self._subscribers.get('*', ()))
+        if not callbacks:
+            print(f"[{self.name}] {line}")
+        for callback in callbacks:
+            try:
+                callback(fields)
+            except Exception as e:
+                print(f"[{self.name}] 受信処理エラー: {e}")
+
+    # ---- スレッド制御 ----
+    def start(self):
+        if self._thread is not None:
+            return
+        self.ser.timeout = self.READ_TIMEOUT
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"serial-reader-{self.name}",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        if self.decoder is not None:
+            self._run_frames()
+            return
+        partial = b""
+        while not self._stop.is_set():
+            try:
+                raw = self.ser.readline()
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"[{self.name}] 受信停止: {e}")
+                break
+            # タイムアウトで途中までしか読めなかった行は次回につなげる
+            raw = partial + raw
+            if not raw.endswith(b"\n"):
+                partial = raw
+                continue
+            partial = b""
+            line = raw.decode('utf-8', errors='ignore').strip()
+            if line:
+                self.dispatch(line)
+
+    def _run_frames(self):
+        while not self._stop.is_set():
+            try:
+                data = self.ser.read(self.ser.in_waiting or 1)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"[{self.name}] 受信停止: {e}")
+                break
+            for frame in self.decoder.feed(data):
+                self.dispatch_fields(frame.fields())
@@ -0,0 +1,218 @@
+"""
+Minimal-move sorting planner for card slots.
+
+A sort is described as a mapping from each occupied slot to the slot its card
+must end up in. The mapping splits into
+  - chains, which end in an empty slot: k cards need k moves, no buffer
+  - cycles, which are closed: k cards need k + 1 moves via one free slot
+so the plan uses the fewest possible pick-and-place operations. Within that,
+the cycle element parked in the buffer and the buffer slot itself are chosen
+to minimise joint travel time between POSITIONS entries.
+"""
+
+
+class SortMove:
+    """One pick-and-place operation."""
+
+    def __init__(self, src, dst, card=None):
+        self.src = src
+        self.dst = dst
+        self.card = card
+
+    def __repr__(self):
+        return f"SortMove({self.src!r} -> {self.dst!r})"
+
+
+class SortPlan:
+    """Ordered moves plus their estimated cost in seconds."""
+
+    def __init__(self, moves, cost):
+        self.moves = moves
+        self.cost = cost
+
+    def describe(self, card_to_string=str):
+        lines = []
+        for i, move in enumerate(self.moves, 1):
+            card = "" if move.card is None else f"  ({card_to_string(move.card)})"
+            lines.append(f"  {i}. {move.src} -> {move.dst}{card}")
+        lines.append(f"  Total: {len(self.moves)} moves, estimated {self.cost:.1f} s")
+        return "\n".join(lines)
+
+
+def arm_cost_model(arm):
+    """
+    Cost functions for a RobotArm.
+
+    Returns:
+        (travel, handling): travel(a, b) is the XY travel time between two
+        POSITIONS keys; handling is the fixed time of one grab_at + place_at
+        (two Z round trips and two grip actions).
+    """
+    z_up = arm.POSITIONS['home'][2]
+    z_down = arm.POSITIONS_GRAB['home'][2]
+    z_move = arm.timing.duration('Z', (z_down - z_up) * arm.LL_SCALE) + arm.wait_margin
+    handling = 4 * z_move + 2 * arm.grip_time
+    return arm.travel_time, handling
+
+
+def _walk_moves(moves, start, travel, handling):
+    """Cost of executing moves in order starting from the arm at `start`."""
+    cost = 0.0
+    here = start
+    for move in moves:
+        cost += travel(here, move.src) + travel(move.src, move.dst) + handling
+        here = move.dst
+    return cost
+
+
+def plan_sort(dest, occupied, free_slots, travel, handling=0.0, start='home', cards=None):
+    """
+    Plan the moves that bring every card to its destination slot.
+
+    Args:
+        dest: {slot: target slot} for every card that must end somewhere
+        occupied: slots that currently hold a card
+        free_slots: slots allowed as temporary buffers (must be empty)
+        travel: travel(a, b) -> seconds between two slots
+        handling: fixed seconds per pick-and-place
+        start: where the arm starts
+        cards: optional {slot: card} used to label the moves
+
+    Returns:
+        SortPlan
+    """
+    cards = dict(cards or {})
+    pending = {s: d for s, d in dest.items() if s != d}
+    targets = set(pending.values())
+    occupied = set(occupied)
+    if len(targets) != len(pending):
+        raise ValueError("two cards share one destination")
+
+    moves = []
+    here = start
+
+    def emit(src, dst):
+        nonlocal here
+        moves.append(SortMove(src, dst, cards.get(src)))
+        cards[dst] = cards.pop(src, None)
+        occupied.discard(src)
+        occupied.add(dst)
+        here = dst
+
+    # Chains: the destination at the end is empty, so fill it first and
+    # walk back towards the start of the chain.
+    while True:
+        ends = [d for d in pending.values() if d not in occupied]
+        if not ends:
+            break
+        slot = ends[0]
+        srcs = {d: s for s, d in pending.items()}
+        while slot in srcs:
+            src = srcs[slot]
+            emit(src, slot)
+            del pending[src]
+            slot = src
+
+    if any(d not in pending for d in pending.values()):
+        raise ValueError("a destination is occupied by a card that does not move")
+
+    # Cycles: park one card in a buffer, rotate the rest, then bring it back.
+    while pending:
+        cycle = [next(iter(pending))]
+        while pending[cycle[-1]] != cycle[0]:
+            cycle.append(pending[cycle[-1]])
+
+        buffers = [b for b in free_slots if b not in occupied and b not in pending]
+        if not buffers:
+            raise ValueError("no free buffer slot to break a cycle")
+
+        best = None
+        for i, parked in enumerate(cycle):
+            # Rotation order: whoever belongs in `parked`'s slot moves first.
+            order = cycle[i:] + cycle[:i]
+            rotation = [SortMove(order[-1], order[0])]
+            rotation += [SortMove(order[j - 1], order[j]) for j in range(len(order) - 1, 1, -1)]
+            for buf in buffers:
+                candidate = ([SortMove(parked, buf)] + rotation
+                             + [SortMove(buf, pending[parked])])
+                cost = _walk_moves(candidate, here, travel, handling)
+                if best is None or cost < best[0]:
+                    best = (cost, candidate)
+
+        for move in best[1]:
+            emit(move.src, move.dst)
+        for slot in cycle:
+            del pending[slot]
+
+    return SortPlan(moves, _walk_moves(moves, start, travel, handling))
+
+
+# ---- Self-test ----
+def _min_moves_brute_force(dest, free_slots):
+    """Fewest moves found by breadth-first search over slot contents (None if impossible)."""
+    from collections import deque
+
+    slots = sorted(set(dest) | set(dest.values()) | set(free_slots))
+    start = tuple(s if s in dest else None for s in slots)
+    goal = [None] * len(slots)
+    for src, dst in dest.items():
+        goal[slots.index(dst)] = src
+    goal = tuple(goal)
+
+    seen = {start: 0}
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        if state == goal:
+            return seen[state]
+        empty = [j for j, card in enumerate(state) if card is None]
+        for i, card in enumerate(state):
+            if card is None:
+                continue
+            for j in empty:
+                nxt = list(state)
+                nxt[i], nxt[j] = None, card
+                nxt = tuple(nxt)
+                if nxt not in seen:
+                    seen[nxt] = seen[state] + 1
+                    queue.append(nxt)
+    return None
+
+
+def _self_test(trials=300, seed=0):
+    """Compare plan_sort against brute force on small random instances."""
+    import random
+
+    rng = random.Random(seed)
+    for _ in range(trials):
+        slots = [f"s{i}" for i in range(rng.randint(1, 6))]
+        occupied = rng.sample(slots, rng.randint(1, len(slots)))
+        dest = dict(zip(occupied, rng.sample(slots, len(occupied))))
+        free = slots  # as in sort_cards: any slot may buffer once it is empty
+        pos = {s: (rng.random(), rng.random()) for s in slots + ['home']}
+
+        def travel(a, b):
+            return abs(pos[a][0] - pos[b][0]) + abs(pos[a][1] - pos[b][1])
+
+        expected = _min_moves_brute_force(dest, free)
+        try:
+            plan = plan_sort(dest, occupied, free, travel, handling=1.0,
+                             cards={s: s for s in occupied})
+        except ValueError:
+            assert expected is None, (dest, free)
+            continue
+        assert expected is not None and len(plan.moves) == expected, (dest, free, plan.moves)
+
+        # Replay: every move picks a card and drops it in an empty slot,
+        # and every card ends where it belongs.
+        board = {s: s for s in occupied}
+        for move in plan.moves:
+            assert move.src in board and move.dst not in board, (dest, plan.moves)
+            board[move.dst] = board.pop(move.src)
+        assert board == {d: s for s, d in dest.items()}, (dest, plan.moves)
+        assert abs(plan.cost - _walk_moves(plan.moves, 'home', travel, 1.0)) < 1e-9
+
+
+if __name__ == "__main__":
+    _self_test()
+    print("sort_planner: ok")
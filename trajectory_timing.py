@@ -0,0 +1,122 @@
+"""
+関節移動時間の予測モデル
+
+指令速度・加速度・移動量から、1軸の移動が終わるまでの時間を求める。
+距離・速度・加速度はシリアルで送るモータ指令値の単位で扱う
+（set_t1 に渡す値が距離、S1 に渡す値が速度）。
+
+- trapezoid: 加速度制限のみの台形速度プロファイル
+- scurve: ジャーク制限付きのS字速度プロファイル（7区間）
+"""
+import math
+
+PROFILES = ('trapezoid', 'scurve')
+
+# ---- 既定パラメータ ----
+# 加速度・ジャークは実機で測った値ではない仮の値。ファームウェア設定値・実測値に合わせて
+# RobotArm(timing_accels=..., timing_jerks=...) で与えること
+DEFAULT_SPEED = {'X': 4.0, 'Y': 4.0, 'Z': 4.0}
+DEFAULT_ACCEL = {'X': 8.0, 'Y': 8.0, 'Z': 8.0}
+DEFAULT_JERK = {'X': 40.0, 'Y': 40.0, 'Z': 40.0}
+
+
+def trapezoid_duration(distance, v_max, a_max):
+    """
+    台形速度プロファイルでの移動時間
+
+    Args:
+        distance: 移動量（符号は無視）
+        v_max: 最高速度
+        a_max: 加速度
+
+    Returns:
+        移動時間(秒)
+    """
+    d = abs(distance)
+    if d == 0:
+        return 0.0
+    if v_max <= 0 or a_max <= 0:
+        raise ValueError("speed and acceleration must be positive")
+
+    # 最高速度に達しない場合は三角形プロファイル
+    if d <= v_max * v_max / a_max:
+        return 2.0 * math.sqrt(d / a_max)
+    return d / v_max + v_max / a_max
+
+
+def _scurve_accel_time(v, a_max, j_max):
+    """速度0からvまで加速する時間（S字）"""
+    if v * j_max < a_max * a_max:
+        # 最大加速度に達しない
+        return 2.0 * math.sqrt(v / j_max)
+    return v / a_max + a_max / j_max
+
+
+def scurve_duration(distance, v_max, a_max, j_max):
+    """
+    S字速度プロファイルでの移動時間
+
+    Args:
+        distance: 移動量（符号は無視）
+        v_max: 最高速度
+        a_max: 加速度
+        j_max: ジャーク
+
+    Returns:
+        移動時間(秒)
+    """
+    d = abs(distance)
+    if d == 0:
+        return 0.0
+    if v_max <= 0 or a_max <= 0 or j_max <= 0:
+        raise ValueError("speed, acceleration and jerk must be positive")
+
+    # 加速と減速は対称なので、到達速度vでの加減速距離は v * Ta(v)
+    v = v_max
+    if v * _scurve_accel_time(v, a_max, j_max) > d:
+        # 最高速度に達しない: 加減速距離がちょうどdになる速度を求める
+        v = (d * d * j_max / 4.0) ** (1.0 / 3.0)
+        if v * j_max >= a_max * a_max:
+            k = a_max / j_max
+            v = a_max * (-k + math.sqrt(k * k + 4.0 * d / a_max)) / 2.0
+    return _scurve_accel_time(v, a_max, j_max) + d / v
+
+
+class JointTimingModel:
+    """軸ごとの速度・加速度を保持して移動時間を予測する"""
+
+    def __init__(self, profile='trapezoid', speeds=None, accels=None, jerks=None):
+        """
+        Args:
+            profile: 'trapezoid' または 'scurve'
+            speeds, accels, jerks: 軸名 -> 値 の辞書（省略時は既定値）
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"unknown profile: {profile}")
+        self.profile = profile
+        self.speeds = dict(DEFAULT_SPEED, **(speeds or {}))
+        self.accels = dict(DEFAULT_ACCEL, **(accels or {}))
+        self.jerks = dict(DEFAULT_JERK, **(jerks or {}))
+
+    def set_speed(self, axis, speed):
+        """指令速度を更新"""
+        self.speeds[axis] = float(speed)
+
+    def duration(self, axis, distance):
+        """1軸の移動時間(秒)"""
+        if self.profile == 'scurve':
+            return scurve_duration(distance, self.speeds[axis],
+                                   self.accels[axis], self.jerks[axis])
+        return trapezoid_duration(distance, self.speeds[axis], self.accels[axis])
+
+    def durations(self, deltas):
+        """
+        複数軸の移動時間
+
+        Args:
+            deltas: 軸名 -> 移動量 の辞書
+
+        Returns:
+            軸名 -> 移動時間(秒) の辞書
+        """
+        return {axis: self.duration(axis, d) for axis, d in deltas.items()}
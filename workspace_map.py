@@ -0,0 +1,169 @@
+"""
+作業領域マップ
+
+XY平面を格子に区切り、各セル中心について
+    REACHABLE      到達可能（関節制限内の解がある）
+    UNREACHABLE    リンク長的に届かない
+    JOINT_LIMITED  届くが、どちらの解も（第1関節を 2π ずらしても）モータの可動範囲外
+                   （RobotArm.MOTOR_LIMITS を校正した場合のみ）
+    FORBIDDEN      禁止領域（台座・障害物など）
+を一度だけ一括計算しておき、目標座標の判定を O(1) で行う。
+判定はセル中心で行うので、境界付近では最終的に逆運動学での確認が必要。
+"""
+import numpy as np
+
+from kinematics_batch import ik_batch
+from ik_branch import TURNS, within_motor_limits
+
+UNREACHABLE = 0
+REACHABLE = 1
+JOINT_LIMITED = 2
+FORBIDDEN = 3
+
+REASONS = {
+    UNREACHABLE: "到達不可能",
+    REACHABLE: "到達可能",
+    JOINT_LIMITED: "関節の可動範囲外",
+    FORBIDDEN: "禁止領域",
+}
+
+# 解ごとの可否ビット
+BRANCH_A = 1
+BRANCH_B = 2
+
+
+def limit_mask(arm, joints):
+    """
+    第1関節を TURNS の周回だけずらした解のどれかがモータの可動範囲内か
+    （BranchSelector が選べる候補と同じ）
+
+    Args:
+        arm: initialize 済みの RobotArm
+        joints: (N, 2) の関節角度 [t1, t2]（rad）
+
+    Returns:
+        (N,) の bool 配列
+    """
+    q = np.asarray(joints, dtype=float).reshape(-1, 2)
+    mask = np.zeros(len(q), dtype=bool)
+    for k in TURNS:
+        mask |= within_motor_limits(arm, q[:, 0] + 2 * np.pi * k, q[:, 1])
+    return mask
+
+
+def forbidden_mask(points, zones):
+    """
+    禁止領域に入っている点
+
+    Args:
+        points: (N, 2) の座標
+        zones: ('circle', cx, cy, r) または ('rect', xmin, ymin, xmax, ymax) のリスト
+    """
+    p = np.asarray(points, dtype=float).reshape(-1, 2)
+    x, y = p[:, 0], p[:, 1]
+    mask = np.zeros(len(p), dtype=bool)
+    for zone in zones:
+        if zone[0] == 'circle':
+            _, cx, cy, r = zone
+            mask |= (x - cx) ** 2 + (y - cy) ** 2 <= r * r
+        elif zone[0] == 'rect':
+            _, x0, y0, x1, y1 = zone
+            mask |= (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+        else:
+            raise ValueError(f"unknown zone: {zone[0]}")
+    return mask
+
+
+class WorkspaceMap:
+    """ラスタ化した作業領域"""
+
+    def __init__(self, codes, branches, origin, resolution):
+        """
+        Args:
+            codes: (H, W) のセル分類
+            branches: (H, W) の可動範囲内の解 (BRANCH_A | BRANCH_B)
+            origin: 左下セルの中心座標 (x, y)
+            resolution: セルの一辺
+        """
+        self.codes = codes
+        self.branches = branches
+        self.origin = origin
+        self.resolution = resolution
+
+    @classmethod
+    def build(cls, arm, resolution=0.01, forbidden=None):
+        """
+        RobotArm の寸法・可動範囲から作成する（initialize 後に呼ぶこと）
+
+        Args:
+            arm: RobotArm
+            resolution: セルの一辺
+            forbidden: 禁止領域のリスト（None=arm.FORBIDDEN_ZONES）
+        """
+        reach = arm.L1 + arm.L2
+        n = int(np.ceil(2 * reach / resolution)) + 1
+        axis = -reach + resolution * np.arange(n)
+        gx, gy = np.meshgrid(axis, axis)  # [行=y, 列=x]
+        points = np.stack([gx.ravel(), gy.ravel()], axis=1)
+
+        sol_a, sol_b, reachable = ik_batch(points, arm.L1, arm.L2)
+        ok_a = reachable & limit_mask(arm, sol_a)
+        ok_b = reachable & limit_mask(arm, sol_b)
+        zones = arm.FORBIDDEN_ZONES if forbidden is None else forbidden
+
+        codes = np.full(len(points), UNREACHABLE, dtype=np.uint8)
+        codes[reachable] = JOINT_LIMITED
+        codes[ok_a | ok_b] = REACHABLE
+        codes[forbidden_mask(points, zones)] = FORBIDDEN
+        branches = (ok_a * BRANCH_A + ok_b * BRANCH_B).astype(np.uint8)
+
+        shape = (n, n)
+        return cls(codes.reshape(shape), branches.reshape(shape),
+                   (float(axis[0]), float(axis[0])), resolution)
+
+    def _index(self, x, y):
+        j = int(round((x - self.origin[0]) / self.resolution))
+        i = int(round((y - self.origin[1]) / self.resolution))
+        h, w = self.codes.shape
+        if 0 <= i < h and 0 <= j < w:
+            return i, j
+        return None
+
+    def classify(self, x, y):
+        """目標座標の分類"""
+        idx = self._index(x, y)
+        return UNREACHABLE if idx is None else int(self.codes[idx])
+
+    def allowed_branches(self, x, y):
+        """可動範囲内の解 (BRANCH_A | BRANCH_B)"""
+        idx = self._index(x, y)
+        return 0 if idx is None else int(self.branches[idx])
+
+    def validate(self, x, y):
+        """
+        目標座標を判定する
+
+        Returns:
+            (True/False, 理由の文字列)
+        """
+        code = self.classify(x, y)
+        return code == REACHABLE, REASONS[code]
+
+    def classify_many(self, points):
+        """
+        複数の目標座標を一括で分類する
+
+        Args:
+            points: (N, 2) の座標
+
+        Returns:
+            (N,) のセル分類（範囲外は UNREACHABLE）
+        """
+        p = np.asarray(points, dtype=float).reshape(-1, 2)
+        j = np.rint((p[:, 0] - self.origin[0]) / self.resolution).astype(int)
+        i = np.rint((p[:, 1] - self.origin[1]) / self.resolution).astype(int)
+        h, w = self.codes.shape
+        inside = (i >= 0) & (i < h) & (j >= 0) & (j < w)
+        out = np.full(len(p), UNREACHABLE, dtype=np.uint8)
+        out[inside] = self.codes[i[inside], j[inside]]
+        return out